@@ -0,0 +1,203 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger('api')
+
+DEFAULT_MAX_INFLIGHT_RESUMES = 64
+DEFAULT_MAX_INFLIGHT_RESUMES_PER_USER = 32
+DEFAULT_MAX_WAIT = 10
+DEFAULT_MAX_QUEUE = 16
+
+
+class AdmissionRejected(Exception):
+    """The server is saturated; the client should retry after ``retry_after`` seconds"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """Admitted work of ``weight`` resumes; release() is idempotent"""
+
+    def __init__(self, controller, user_key, weight):
+        self.controller = controller
+        self.user_key = user_key
+        self.weight = weight
+        self.admitted_at = time.monotonic()
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.controller._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class AdmissionController:
+    """
+    Bounds the resumes being scored at once in this process, overall
+    (``capacity``) and per user (``per_user_capacity``). Requests weigh as
+    many units as they have resumes; one larger than a limit is clamped to
+    it, so it runs alone rather than never.
+
+    Waiting requests are admitted in arrival order, so a large batch is not
+    starved by a stream of small ones; only requests held back by their own
+    user's limit let later ones pass. A request waits at most
+    ``max_wait`` seconds, and is turned away at once when ``max_queue``
+    requests are already waiting.
+    """
+
+    def __init__(self, capacity, per_user_capacity=None, max_wait=DEFAULT_MAX_WAIT,
+                 max_queue=DEFAULT_MAX_QUEUE):
+        self.capacity = capacity
+        self.per_user_capacity = per_user_capacity or capacity
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._per_user = {}
+        self._queue = deque()
+        self._condition = threading.Condition()
+        # Moving average of how long admitted work holds its units, for Retry-After
+        self._average_hold = None
+
+    def _fits_user(self, user_key, weight):
+        return self._per_user.get(user_key, 0) + min(weight, self.per_user_capacity) <= self.per_user_capacity
+
+    def _fits(self, user_key, weight):
+        return (
+            self.in_flight + min(weight, self.capacity) <= self.capacity
+            and self._fits_user(user_key, weight)
+        )
+
+    def _is_next(self, waiter):
+        """Whether ``waiter`` fits and no earlier waiter could use the room first"""
+        for earlier in self._queue:
+            if earlier is waiter:
+                return self._fits(*waiter)
+            if self._fits_user(*earlier):
+                return False
+        return False
+
+    def retry_after(self):
+        """Seconds a rejected client should wait before retrying"""
+        estimate = self._average_hold if self._average_hold is not None else self.max_wait
+        return max(1, math.ceil(estimate))
+
+    def admit(self, user_key, weight, timeout=-1):
+        """
+        Wait for room for ``weight`` resumes of ``user_key`` and return a
+        Ticket to release when done. ``timeout`` defaults to max_wait; None
+        waits indefinitely. Raises AdmissionRejected when the queue is full
+        or the wait times out.
+        """
+        if timeout == -1:
+            timeout = self.max_wait
+        weight = max(1, weight)
+        started = time.monotonic()
+        with self._condition:
+            if not self._queue and self._fits(user_key, weight):
+                return self._grant(user_key, weight, started)
+            # Callers willing to wait indefinitely (background jobs) always queue
+            if timeout is not None and self.max_queue is not None and len(self._queue) >= self.max_queue:
+                metrics.ADMISSIONS.inc(result='queue_full')
+                raise AdmissionRejected('queue full', self.retry_after())
+
+            # A fresh list per waiter, compared by identity
+            entry = [user_key, weight]
+            self._queue.append(entry)
+            deadline = None if timeout is None else started + timeout
+            try:
+                while not self._is_next(entry):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        metrics.ADMISSIONS.inc(result='timeout')
+                        raise AdmissionRejected('timed out waiting', self.retry_after())
+                    self._condition.wait(remaining)
+                return self._grant(user_key, weight, started)
+            finally:
+                self._queue.remove(entry)
+                # The next request in line may fit now
+                self._condition.notify_all()
+
+    def _grant(self, user_key, weight, started):
+        weight = min(weight, self.capacity, self.per_user_capacity)
+        self.in_flight += weight
+        self._per_user[user_key] = self._per_user.get(user_key, 0) + weight
+        metrics.ADMISSIONS.inc(result='admitted')
+        metrics.ADMISSION_WAIT_SECONDS.observe(time.monotonic() - started)
+        metrics.INFLIGHT_RESUMES.set(self.in_flight)
+        return Ticket(self, user_key, weight)
+
+    def _release(self, ticket):
+        with self._condition:
+            self.in_flight -= ticket.weight
+            remaining = self._per_user.get(ticket.user_key, 0) - ticket.weight
+            if remaining > 0:
+                self._per_user[ticket.user_key] = remaining
+            else:
+                self._per_user.pop(ticket.user_key, None)
+            held = time.monotonic() - ticket.admitted_at
+            self._average_hold = held if self._average_hold is None else 0.8 * self._average_hold + 0.2 * held
+            metrics.INFLIGHT_RESUMES.set(self.in_flight)
+            self._condition.notify_all()
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    """
+    The process-wide controller configured by the ATS_MAX_INFLIGHT_* and
+    ATS_ADMISSION_* settings, or None when ATS_MAX_INFLIGHT_RESUMES is 0
+    """
+    global _controller
+    capacity = getattr(settings, 'ATS_MAX_INFLIGHT_RESUMES', DEFAULT_MAX_INFLIGHT_RESUMES)
+    if not capacity:
+        return None
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(
+                    capacity,
+                    getattr(settings, 'ATS_MAX_INFLIGHT_RESUMES_PER_USER', DEFAULT_MAX_INFLIGHT_RESUMES_PER_USER),
+                    max_wait=getattr(settings, 'ATS_ADMISSION_MAX_WAIT', DEFAULT_MAX_WAIT),
+                    max_queue=getattr(settings, 'ATS_ADMISSION_MAX_QUEUE', DEFAULT_MAX_QUEUE),
+                )
+    return _controller
+
+
+def admit(user_key, weight, timeout=-1):
+    """Ticket from the process-wide controller; a no-op ticket when admission control is off"""
+    controller = get_admission_controller()
+    if controller is None:
+        return _Unlimited()
+    return controller.admit(user_key, weight, timeout)
+
+
+class _Unlimited:
+    def release(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from .model_loader import is_serving_process, should_warm_up, start_warmup
+
+        # Load the encoder off the request path so the first request (and the
+        # readiness probe) do not pay for it, and pick up queued jobs; only
+        # server processes do this, never management commands or scripts.
+        if is_serving_process():
+            from .jobs import start_workers
+
+            if should_warm_up():
+                start_warmup()
+            start_workers()
@@ -3,24 +3,23 @@ import string
 import nltk
 import numpy as np
 from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
 from nltk.tokenize import word_tokenize
 import logging
-from .nltk_utils import ensure_nltk_data
+import threading
+from .nltk_utils import ensure_nltk_data, get_lemmatizer, lemmatize
 
 logger = logging.getLogger(__name__)
 
-# Ensure NLTK data is available
-ensure_nltk_data()
-
 class TextCleaner:
     """
     A class used to clean text by removing stopwords, punctuation, and performing lemmatization.
     """
     def __init__(self) -> None:
+        # Ensure NLTK data is available
+        ensure_nltk_data()
         try:
             self.set_of_stopwords = set(stopwords.words("english") + list(string.punctuation))
-            self.lemmatizer = WordNetLemmatizer()
+            self.lemmatizer = get_lemmatizer()
         except Exception as e:
             logger.error(f"Error initializing TextCleaner: {e}")
             self.set_of_stopwords = set(string.punctuation)
@@ -32,7 +31,7 @@ class TextCleaner:
             tokens = [token for token in tokens if token not in self.set_of_stopwords]
             
             if self.lemmatizer:
-                tokens = [self.lemmatizer.lemmatize(token) for token in tokens]
+                tokens = [lemmatize(token) for token in tokens]
             
             cleaned_text = " ".join(tokens)
             return cleaned_text
@@ -40,4 +39,27 @@ class TextCleaner:
             logger.error(f"Error cleaning text: {e}")
             # Fallback to simple cleaning
             return " ".join([word for word in raw_text.lower().split() 
-                           if word not in self.set_of_stopwords])
\ No newline at end of file
+                           if word not in self.set_of_stopwords])
+
+    @property
+    def complete(self) -> bool:
+        """False when built with the stopword/lemmatizer fallback"""
+        return self.lemmatizer is not None
+
+_text_cleaner = None
+_text_cleaner_lock = threading.Lock()
+
+def get_text_cleaner():
+    """
+    Return the process-wide TextCleaner. A fallback cleaner (NLTK data
+    missing) is not kept, so a later call retries the full one.
+    """
+    global _text_cleaner
+    if _text_cleaner is None:
+        with _text_cleaner_lock:
+            if _text_cleaner is None:
+                cleaner = TextCleaner()
+                if not cleaner.complete:
+                    return cleaner
+                _text_cleaner = cleaner
+    return _text_cleaner
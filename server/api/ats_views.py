@@ -1,33 +1,86 @@
 import json
 import logging
+import os
+import time
+import uuid
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser, FormParser
-import tempfile
-import os
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 
-from .job_matcher import compute_final_score
-from .semantic_matcher import ATS
+from . import admission, batch_store, keyword_index, metrics, profiling
+from .file_parsing import parse_upload
+from .job_matcher import ROLE_WEIGHTS
+from .jobs import start_workers, submit_job
+from .models import ResumeBatch, ScoringJob
+from .model_loader import ensure_warmup, is_model_ready, model_status
+from .pagination import PAGE_PARAMS, page_results, parse_page_params
+from .scoring import ResumeScorer, rank_results
+from .serializers import ScoringJobSerializer
+from .term_matching import get_matcher
 
 logger = logging.getLogger('api')
 
-# Global ATS instance to avoid reloading the model for each request
-_ats_instance = None
 
-def get_ats_instance():
-    """Get or create a singleton ATS instance to avoid reloading the model"""
-    global _ats_instance
-    if _ats_instance is None:
-        logger.info("Initializing ATS instance...")
-        _ats_instance = ATS()
-        logger.info("ATS instance initialized successfully")
-    return _ats_instance
+def get_user_batch(user, batch_id):
+    """The ResumeBatch with ``batch_id`` if it belongs to ``user``, else None"""
+    try:
+        return ResumeBatch.objects.filter(pk=uuid.UUID(str(batch_id)), user=user).first()
+    except ValueError:
+        return None
+
+
+def busy_response(rejection):
+    """429 telling the client when to retry a request admission control turned away"""
+    return Response(
+        {'error': 'Server is busy scoring other resumes, please retry shortly', 'retry_after': rejection.retry_after}, 
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={'Retry-After': str(rejection.retry_after)}
+    )
+
+
+def get_page_request(request):
+    """PageRequest from the query string, overridden by the request body"""
+    params = request.query_params.dict()
+    params.update({name: request.data[name] for name in PAGE_PARAMS if name in request.data})
+    return parse_page_params(params)
+
+
+def invalid_page_response(error):
+    return Response(
+        {'error': f'Invalid pagination parameters: {str(error)}'}, 
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
 
-class ResumeProcessingView(APIView):
+class InstrumentedViewMixin:
     """
-    API endpoint for processing resumes and calculating ATS scores
+    Times each request into ats_request_seconds. In DEBUG, ?timings=true
+    adds the time spent in each scoring stage (in ms) to the response.
+    """
+    
+    def dispatch(self, request, *args, **kwargs):
+        start = time.perf_counter()
+        with metrics.request_stages() as stages:
+            response = super().dispatch(request, *args, **kwargs)
+        # A streamed response is only produced after dispatch returns
+        if not response.streaming:
+            metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, view=type(self).__name__)
+        wants_timings = request.GET.get('timings', '').lower() in ('1', 'true', 'yes')
+        if settings.DEBUG and wants_timings and isinstance(getattr(response, 'data', None), dict):
+            response.data['timings'] = metrics.stage_breakdown(stages)
+        return response
+
+class ResumeProcessingView(profiling.ProfilingMixin, InstrumentedViewMixin, APIView):
+    """
+    API endpoint for processing resumes and calculating ATS scores.
+
+    Optional top_k, limit, cursor, fields and exclude parameters return
+    only part of the ranking (see pagination.PageRequest); later pages are
+    read from the stored batch with BatchResultsView.
     """
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
@@ -68,48 +121,7 @@ class ResumeProcessingView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Process all resumes
-            results = []
-            for resume_file in resume_files:
-                try:
-                    resume_text = self._parse_file(resume_file)
-                    if not resume_text:
-                        logger.warning(f"Failed to parse resume: {resume_file.name}")
-                        continue
-                    
-                    # Calculate scores
-                    keyword_score = self._calculate_keyword_score(resume_text, jd_text, job_role)
-                    semantic_score = self._calculate_semantic_score(resume_text, jd_text)
-                    
-                    # Calculate final weighted score
-                    final_score = round(
-                        (keyword_score * keyword_weight) + (semantic_score * (1 - keyword_weight))
-                    )
-                    
-                    results.append({
-                        'resume': resume_file.name,
-                        'score': final_score,
-                        'keywordScore': round(keyword_score),
-                        'semanticScore': round(semantic_score),
-                        'text': resume_text[:500]  # First 500 chars for keyword search
-                    })
-                    
-                    logger.info(f"Processed resume: {resume_file.name} - Score: {final_score}")
-                    
-                except Exception as e:
-                    logger.error(f"Error processing resume {resume_file.name}: {str(e)}")
-                    continue
-            
-            # Sort by score descending
-            results.sort(key=lambda x: x['score'], reverse=True)
-            
-            logger.info(f"Successfully processed {len(results)} resumes for user: {request.user.email}")
-            
-            return Response({
-                'results': results,
-                'total_processed': len(results),
-                'job_role': job_role
-            }, status=status.HTTP_200_OK)
+            return self._process(request, resume_files, jd_text, job_role, keyword_weight)
             
         except Exception as e:
             logger.error(f"Resume processing error for user {request.user.email}: {str(e)}")
@@ -118,105 +130,200 @@ class ResumeProcessingView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    def _process(self, request, resume_files, jd_text, job_role, keyword_weight):
+        """Score the validated upload and build the response"""
+        # Large batches can be queued instead of holding the connection
+        if str(request.data.get('async', '')).lower() in ('1', 'true', 'yes'):
+            job = submit_job(request.user, resume_files, jd_text, job_role, keyword_weight)
+            return Response(
+                ScoringJobSerializer(job).data,
+                status=status.HTTP_202_ACCEPTED
+            )
+        
+        try:
+            page = get_page_request(request)
+        except ValueError as e:
+            return invalid_page_response(e)
+        
+        try:
+            ticket = admission.admit(request.user.pk, len(resume_files))
+        except admission.AdmissionRejected as e:
+            logger.warning(f"Scoring request from {request.user.email} turned away: {e.reason}")
+            return busy_response(e)
+        
+        with ticket:
+            batch = batch_store.create_batch(request.user, job_role, keyword_weight, jd_text)
+            scorer = ResumeScorer(jd_text, job_role, keyword_weight, batch=batch)
+            scored = scorer.score_files(resume_files)
+        results, next_cursor = page_results(scored, page)
+        
+        logger.info(f"Successfully processed {len(scored)} resumes for user: {request.user.email}")
+        
+        data = {
+            'results': results,
+            'total_processed': len(scored),
+            'job_role': job_role,
+            'batch_id': str(batch.pk)
+        }
+        if page.paginated:
+            data['next_cursor'] = next_cursor
+        return Response(data, status=status.HTTP_200_OK)
+    
     def _parse_file(self, file):
         """Parse uploaded file and extract text content"""
-        try:
-            if file.content_type == 'application/pdf':
-                return self._extract_text_from_pdf(file)
-            elif file.content_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
-                return self._extract_text_from_docx(file)
-            else:
-                logger.warning(f"Unsupported file type: {file.content_type}")
-                return ""
-        except Exception as e:
-            logger.error(f"File parsing error: {str(e)}")
-            return ""
+        with metrics.timer('parse_jd'):
+            return parse_upload(file)
+
+
+class _ReleasingStream:
+    """
+    Streaming content that releases an admission ticket when Django closes
+    the response, including when the client disconnects before the body
+    generator ever started
+    """
     
-    def _extract_text_from_pdf(self, file):
-        """Extract text from PDF file"""
-        try:
-            import pymupdf  # PyMuPDF
-            
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                for chunk in file.chunks():
-                    temp_file.write(chunk)
-                temp_file_path = temp_file.name
-            
-            try:
-                # Extract text using PyMuPDF
-                doc = pymupdf.open(temp_file_path)
-                text = ""
-                for page in doc:
-                    text += page.get_text()
-                doc.close()
-                return text
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_file_path)
-                
-        except Exception as e:
-            logger.error(f"PDF extraction error: {str(e)}")
-            return ""
+    def __init__(self, body, ticket):
+        self.body = body
+        self.ticket = ticket
     
-    def _extract_text_from_docx(self, file):
-        """Extract text from DOCX file"""
-        try:
-            import docx
-            
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp_file:
-                for chunk in file.chunks():
-                    temp_file.write(chunk)
-                temp_file_path = temp_file.name
-            
-            try:
-                # Extract text using python-docx
-                doc = docx.Document(temp_file_path)
-                text = ""
-                for paragraph in doc.paragraphs:
-                    text += paragraph.text + "\n"
-                return text
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_file_path)
-                
-        except Exception as e:
-            logger.error(f"DOCX extraction error: {str(e)}")
-            return ""
+    def __iter__(self):
+        return self.body
     
-    def _calculate_keyword_score(self, resume_text, jd_text, job_role):
-        """Calculate keyword-based score using job_matcher"""
+    def close(self):
+        self.body.close()
+        self.ticket.release()
+
+
+class ResumeStreamView(ResumeProcessingView):
+    """
+    Streaming variant of ResumeProcessingView. Emits one event per resume
+    as soon as it is scored, then a final event with the full ranking.
+
+    Responds with Server-Sent Events by default, or newline-delimited JSON
+    when called with ?stream_format=ndjson or Accept: application/x-ndjson.
+    """
+
+    def perform_content_negotiation(self, request, force=False):
+        # The stream bypasses DRF renderers, so Accept: text/event-stream or
+        # application/x-ndjson must not be rejected; errors still render as JSON
+        return super().perform_content_negotiation(request, force=True)
+
+    def _process(self, request, resume_files, jd_text, job_role, keyword_weight):
+        # Every result is streamed as it is scored, so paging does not apply
+        ndjson = (
+            request.query_params.get('stream_format') == 'ndjson'
+            or 'application/x-ndjson' in request.headers.get('Accept', '')
+        )
         try:
-            return compute_final_score(resume_text, jd_text, job_role)
-        except Exception as e:
-            logger.error(f"Keyword scoring error: {str(e)}")
-            return 0
+            ticket = admission.admit(request.user.pk, len(resume_files))
+        except admission.AdmissionRejected as e:
+            logger.warning(f"Scoring request from {request.user.email} turned away: {e.reason}")
+            return busy_response(e)
+        
+        try:
+            batch = batch_store.create_batch(request.user, job_role, keyword_weight, jd_text)
+        except Exception:
+            ticket.release()
+            raise
+        events = self._events(request.user.email, resume_files, jd_text, job_role, keyword_weight, batch, ticket)
+        if ndjson:
+            body = (json.dumps({'type': event, **data}) + '\n' for event, data in events)
+            content_type = 'application/x-ndjson'
+        else:
+            body = (f"event: {event}\ndata: {json.dumps(data)}\n\n" for event, data in events)
+            content_type = 'text/event-stream'
+        response = StreamingHttpResponse(_ReleasingStream(body, ticket), content_type=content_type)
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # keep nginx from buffering the stream
+        return response
     
-    def _calculate_semantic_score(self, resume_text, jd_text):
-        """Calculate semantic similarity score"""
+    def _events(self, email, resume_files, jd_text, job_role, keyword_weight, batch, ticket):
+        """Yield (event, data) pairs; runs after the view has returned"""
+        results = []
         try:
-            ats = get_ats_instance()
-            ats.load_resume(resume_text)
-            ats.load_job_description(jd_text)
-            
-            experience = ats.extract_experience()
-            ats.clean_experience(experience)
-            
-            skills = " ".join(ats.extract_skills())
-            ats.clean_skills(skills)
-            
-            similarity_score = ats.compute_similarity() * 100
-            logger.debug(f"Semantic similarity score calculated: {similarity_score}")
-            return similarity_score
+            scorer = ResumeScorer(jd_text, job_role, keyword_weight, batch=batch)
+            for scored in scorer.iter_scores(resume_files):
+                for result in scored:
+                    results.append(result)
+                    yield 'result', {**result, 'processed': len(results), 'total': len(resume_files)}
+            # Two-stage ranking: the best screened resumes get final scores
+            reranked = scorer.rerank()
+            if reranked:
+                yield 'rerank', {'results': reranked}
         except Exception as e:
-            logger.error(f"Semantic scoring error: {str(e)}")
-            return 0
+            logger.error(f"Resume streaming error for user {email}: {str(e)}")
+            yield 'error', {'error': 'Internal server error during processing'}
+        # Scoring is over; the capacity is free before the final event is sent
+        ticket.release()
+        
+        logger.info(f"Successfully streamed {len(results)} resumes for user: {email}")
+        yield 'ranking', {
+            'results': rank_results(results),
+            'total_processed': len(results),
+            'job_role': job_role,
+            'batch_id': str(batch.pk)
+        }
+
+
+class MetricsView(APIView):
+    """
+    In-process scoring metrics (stage timings, cache hit rates, counts) in
+    the Prometheus text format, for scraping
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    
+    def get(self, request):
+        return HttpResponse(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
+class ReadinessView(APIView):
+    """
+    Readiness probe: 200 once the scoring model is loaded, 503 while it is
+    still loading (or failed), so load balancers hold traffic until then.
+    A probe that finds the model not loaded (ATS_WARMUP_ON_STARTUP off)
+    starts loading it.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    
+    def get(self, request):
+        ready = is_model_ready()
+        if not ready:
+            ensure_warmup()
+        return Response(
+            {'status': 'ready' if ready else 'unavailable', 'model': model_status()},
+            status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+        )
 
 
-class KeywordFilterView(APIView):
+class ScoringJobView(APIView):
     """
-    API endpoint for filtering resumes by keywords
+    API endpoint reporting the progress and (partial) ranked results of
+    a background scoring job
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, job_id):
+        # Jobs left queued by a restarted process resume once someone polls
+        start_workers()
+        job = ScoringJob.objects.filter(pk=job_id, user=request.user).first()
+        if job is None:
+            return Response(
+                {'error': 'Job not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(ScoringJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+class KeywordFilterView(profiling.ProfilingMixin, InstrumentedViewMixin, APIView):
+    """
+    API endpoint for filtering resumes by keywords.
+
+    With a batch_id (returned by the processing endpoints) the query runs
+    against the server-side full-text index of that batch and supports
+    AND/OR/NOT, parentheses and "quoted phrases". Without one, the
+    submitted results are filtered by substring as before.
     """
     permission_classes = [IsAuthenticated]
     
@@ -224,6 +331,7 @@ class KeywordFilterView(APIView):
         try:
             results = request.data.get('results', [])
             keywords = request.data.get('keywords', '')
+            batch_id = request.data.get('batch_id')
             
             if not keywords.strip():
                 return Response(
@@ -231,18 +339,10 @@ class KeywordFilterView(APIView):
                     status=status.HTTP_200_OK
                 )
             
-            # Filter results by keywords
-            search_terms = [term.strip().lower() for term in keywords.split(',')]
-            filtered_results = []
+            if batch_id:
+                return self._search_batch(request, batch_id, keywords)
             
-            for result in results:
-                resume_text = result.get('text', '').lower()
-                matched_keywords = [term for term in search_terms if term in resume_text]
-                
-                if matched_keywords:
-                    result_copy = result.copy()
-                    result_copy['matchedKeywords'] = matched_keywords
-                    filtered_results.append(result_copy)
+            filtered_results = self._filter_results(results, keywords)
             
             logger.info(f"Keyword filtering completed for user: {request.user.email}")
             
@@ -257,3 +357,190 @@ class KeywordFilterView(APIView):
                 {'detail': 'Internal server error during keyword filtering'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    def _search_batch(self, request, batch_id, keywords):
+        """Query the keyword index of one of the user's batches"""
+        batch = get_user_batch(request.user, batch_id)
+        if batch is None:
+            return Response(
+                {'error': 'Batch not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        if keyword_index.is_available():
+            try:
+                with metrics.timer('keyword_search'):
+                    filtered_results = keyword_index.search(batch, keywords)
+            except keyword_index.QuerySyntaxError as e:
+                return Response(
+                    {'error': f'Invalid keyword query: {str(e)}'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            # No FTS5: substring matching over the stored results
+            filtered_results = rank_results(self._filter_results(
+                [row.result for row in batch.resumes.all()], keywords
+            ))
+        
+        logger.info(f"Keyword search of batch {batch.pk} completed for user: {request.user.email}")
+        
+        return Response({
+            'filtered_results': filtered_results,
+            'total_matches': len(filtered_results),
+            'batch_id': str(batch.pk)
+        }, status=status.HTTP_200_OK)
+    
+    def _filter_results(self, results, keywords):
+        """Keep results whose text contains any comma-separated keyword as a whole word"""
+        search_terms = [term.strip().lower() for term in keywords.split(',') if term.strip()]
+        matcher = get_matcher(tuple(search_terms))
+        filtered_results = []
+        
+        for result in results:
+            keyword_counts = matcher.counts(result.get('text', ''))
+            matched_keywords = [term for term in matcher.terms if keyword_counts[term]]
+            
+            if matched_keywords:
+                result_copy = result.copy()
+                result_copy['matchedKeywords'] = matched_keywords
+                result_copy['keywordCounts'] = dict(keyword_counts)
+                filtered_results.append(result_copy)
+        
+        return filtered_results
+
+
+class BatchRerankView(profiling.ProfilingMixin, InstrumentedViewMixin, APIView):
+    """
+    API endpoint re-ranking a stored batch for another job role and/or
+    keyword weight. Final scores are recomputed from the component and
+    semantic scores kept with the batch, so no file is parsed or encoded.
+    Accepts the same paging parameters as ResumeProcessingView.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, batch_id):
+        try:
+            batch = get_user_batch(request.user, batch_id)
+            if batch is None:
+                return Response(
+                    {'error': 'Batch not found'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            
+            job_role = request.data.get('job_role') or batch.job_role
+            if job_role not in ROLE_WEIGHTS:
+                return Response(
+                    {'error': f'Unknown job role: {job_role}'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            try:
+                keyword_weight = float(request.data.get('keyword_weight', batch.keyword_weight))
+            except (TypeError, ValueError):
+                keyword_weight = -1
+            if not 0 <= keyword_weight <= 1:
+                return Response(
+                    {'error': 'keyword_weight must be a number between 0 and 1'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            try:
+                page = get_page_request(request)
+            except ValueError as e:
+                return invalid_page_response(e)
+            
+            with metrics.timer('batch_rerank'):
+                reranked = batch_store.rerank_batch(batch, job_role, keyword_weight)
+            results, next_cursor = page_results(reranked, page)
+            
+            logger.info(f"Re-ranked batch {batch.pk} ({len(reranked)} resumes) for user: {request.user.email}")
+            
+            data = {
+                'results': results,
+                'total_processed': len(reranked),
+                'job_role': job_role,
+                'keyword_weight': keyword_weight,
+                'batch_id': str(batch.pk)
+            }
+            if page.paginated:
+                data['next_cursor'] = next_cursor
+            return Response(data, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            logger.error(f"Batch re-ranking error for user {request.user.email}: {str(e)}")
+            return Response(
+                {'error': 'Internal server error during re-ranking'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class BatchResultsView(profiling.ProfilingMixin, InstrumentedViewMixin, APIView):
+    """
+    API endpoint reading the ranked results of a stored batch one page at
+    a time: ?limit=&cursor= (cursor being the previous page's next_cursor),
+    plus optional top_k, fields and exclude.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, batch_id):
+        try:
+            batch = get_user_batch(request.user, batch_id)
+            if batch is None:
+                return Response(
+                    {'error': 'Batch not found'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            
+            try:
+                page = get_page_request(request)
+            except ValueError as e:
+                return invalid_page_response(e)
+            
+            results, next_cursor = batch_store.page_batch(batch, page)
+            
+            return Response({
+                'results': results,
+                'total_processed': batch.resumes.count(),
+                'job_role': batch.job_role,
+                'keyword_weight': batch.keyword_weight,
+                'batch_id': str(batch.pk),
+                'next_cursor': next_cursor
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            logger.error(f"Batch results error for user {request.user.email}: {str(e)}")
+            return Response(
+                {'error': 'Internal server error while reading results'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ProfileListView(APIView):
+    """
+    Staff-only list of the stored request profiles (see
+    profiling.ProfilingMixin), newest first
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response({'profiles': profiling.list_profiles()}, status=status.HTTP_200_OK)
+
+
+class ProfileView(APIView):
+    """
+    Staff-only download of a stored request profile as a cProfile .prof
+    file (for pstats or snakeviz), or with ?output=text as a pstats report
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request, profile_id):
+        path = profiling.profile_path(profile_id)
+        if path is None or not os.path.exists(path):
+            return Response(
+                {'error': 'Profile not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        if request.query_params.get('output') == 'text':
+            return HttpResponse(profiling.profile_summary(profile_id), content_type='text/plain; charset=utf-8')
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=f"{profile_id}.prof")
@@ -0,0 +1,140 @@
+import logging
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from . import keyword_index
+from .jd_cache import jd_digest
+from .job_matcher import COMPONENTS, weight_components
+from .models import BatchResume, ResumeBatch
+from .pagination import rank_page, select_fields
+
+logger = logging.getLogger('api')
+
+DEFAULT_BATCH_RETENTION_DAYS = 7
+
+_last_purge = 0.0
+
+
+def create_batch(user, job_role, keyword_weight=0.5, jd_text='', batch_id=None):
+    """Start a new batch (or restart the one with ``batch_id``) for ``user``"""
+    purge_expired_batches()
+    fields = {
+        'user': user,
+        'job_role': job_role,
+        'keyword_weight': keyword_weight,
+        'jd_hash': jd_digest(jd_text) if jd_text else '',
+    }
+    if batch_id is not None:
+        batch, created = ResumeBatch.objects.get_or_create(id=batch_id, defaults=fields)
+        if not created:
+            clear_batch(batch)
+        return batch
+    return ResumeBatch.objects.create(**fields)
+
+
+def add_resumes(batch, resumes):
+    """
+    Store scored resumes in ``batch`` and index their full text. Each
+    resume is a (name, full text, content hash, components, semantic score,
+    result) tuple. Returns the new BatchResume ids in input order.
+    """
+    with transaction.atomic():
+        rows = BatchResume.objects.bulk_create([
+            BatchResume(
+                batch=batch,
+                name=name,
+                content_hash=content_hash or '',
+                components=[float(score) for score in components] if components is not None else [],
+                semantic_score=float(semantic_score),
+                result=result,
+            )
+            for name, _, content_hash, components, semantic_score, result in resumes
+        ])
+        keyword_index.index_resumes(batch, [
+            (row.pk, resume[1]) for row, resume in zip(rows, resumes)
+        ])
+    return [row.pk for row in rows]
+
+
+def update_results(updates):
+    """Replace the stored result and semantic score of each (BatchResume id, result, semantic score)"""
+    with transaction.atomic():
+        for pk, result, semantic_score in updates:
+            BatchResume.objects.filter(pk=pk).update(result=result, semantic_score=float(semantic_score))
+
+
+def rerank_batch(batch, job_role, keyword_weight):
+    """
+    Recompute the final and keyword scores of every resume in ``batch``
+    for a new role and/or keyword weight from the stored component and
+    semantic scores, in one vectorized pass; nothing is parsed or encoded.
+    The new scores are saved. Returns the updated results in storage order.
+    """
+    rows = list(batch.resumes.all())
+    if rows:
+        # Resumes whose keyword scoring failed have no components and score 0
+        components = np.zeros((len(rows), len(COMPONENTS)))
+        for index, row in enumerate(rows):
+            if len(row.components) == len(COMPONENTS):
+                components[index] = row.components
+        keyword_scores = weight_components(components, job_role)
+        semantic_scores = np.array([row.semantic_score for row in rows], dtype=np.float64)
+        final_scores = keyword_scores * keyword_weight + semantic_scores * (1 - keyword_weight)
+
+        for row, keyword_score, final_score in zip(rows, keyword_scores, final_scores):
+            row.result = {
+                **row.result,
+                'score': round(float(final_score)),
+                'keywordScore': round(float(keyword_score)),
+            }
+
+    with transaction.atomic():
+        BatchResume.objects.bulk_update(rows, ['result'], batch_size=500)
+        batch.job_role = job_role
+        batch.keyword_weight = keyword_weight
+        batch.save(update_fields=['job_role', 'keyword_weight'])
+    return [row.result for row in rows]
+
+
+def page_batch(batch, page):
+    """
+    One ranked page of the stored results of ``batch`` for a PageRequest.
+    Only the ids and scores of the batch are read to rank it; full
+    results are loaded for the selected page alone. Returns
+    (results, next_cursor).
+    """
+    scores = batch.resumes.order_by('id').values_list('id', 'result__score')
+    ids, next_cursor = rank_page(
+        ((score or 0, seq, pk) for seq, (pk, score) in enumerate(scores)), page
+    )
+    rows = BatchResume.objects.in_bulk(ids)
+    return [select_fields(rows[pk].result, page) for pk in ids], next_cursor
+
+
+def clear_batch(batch):
+    """Remove every resume of ``batch`` from the store and the index"""
+    with transaction.atomic():
+        keyword_index.remove_batch(batch)
+        batch.resumes.all().delete()
+
+
+def purge_expired_batches():
+    """Delete batches older than ATS_BATCH_RETENTION_DAYS, at most hourly"""
+    global _last_purge
+    now = time.monotonic()
+    if _last_purge and now - _last_purge < 3600:
+        return
+    _last_purge = now
+    days = getattr(settings, 'ATS_BATCH_RETENTION_DAYS', DEFAULT_BATCH_RETENTION_DAYS)
+    expired = ResumeBatch.objects.filter(created_at__lt=timezone.now() - timedelta(days=days))
+    try:
+        for batch in expired:
+            clear_batch(batch)
+            batch.delete()
+    except DatabaseError as e:
+        logger.error(f"Batch purge error: {str(e)}")
@@ -0,0 +1,81 @@
+import dataclasses
+import hashlib
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+from django.db import IntegrityError
+
+from .models import ResumeEmbedding
+
+logger = logging.getLogger('api')
+
+
+@dataclass(frozen=True, eq=False)
+class StoredResume:
+    """A previously processed resume loaded from the embedding store."""
+    content_hash: str
+    text: str
+    experience: str
+    skills: list
+    cleaned_experience: str
+    cleaned_skills: str
+    embedding: np.ndarray
+    entities: dict = None  # organizations, dates and skills from the NER stage
+
+
+def file_digest(file):
+    """SHA-256 of an uploaded file's bytes; the file is rewound afterwards."""
+    sha = hashlib.sha256()
+    for chunk in file.chunks():
+        sha.update(chunk)
+    file.seek(0)
+    return sha.hexdigest()
+
+
+def lookup(content_hashes, model_name, model_version, dimension=None):
+    """
+    Return {content_hash: StoredResume} for the hashes already embedded.
+    With ``dimension``, vectors of any other size are ignored.
+    """
+    rows = ResumeEmbedding.objects.filter(
+        content_hash__in=set(content_hashes),
+        model_name=model_name,
+        model_version=model_version,
+    )
+    if dimension is not None:
+        rows = rows.filter(dimension=dimension)
+    return {
+        row.content_hash: StoredResume(
+            content_hash=row.content_hash,
+            text=row.text,
+            experience=row.experience,
+            skills=row.skills,
+            cleaned_experience=row.cleaned_experience,
+            cleaned_skills=row.cleaned_skills,
+            embedding=np.frombuffer(bytes(row.embedding), dtype='<f4'),
+            entities=row.entities,
+        )
+        for row in rows
+    }
+
+
+def save(content_hash, model_name, model_version, text, prepared, embedding):
+    """Persist a newly embedded resume. Concurrent duplicates are ignored."""
+    embedding = np.asarray(embedding, dtype='<f4')
+    try:
+        ResumeEmbedding.objects.create(
+            content_hash=content_hash,
+            model_name=model_name,
+            model_version=model_version,
+            text=text,
+            experience=prepared.experience,
+            skills=prepared.skills,
+            cleaned_experience=prepared.cleaned_experience,
+            cleaned_skills=prepared.cleaned_skills,
+            entities=dataclasses.asdict(prepared.entities) if prepared.entities is not None else None,
+            dimension=embedding.shape[0],
+            embedding=embedding.tobytes(),
+        )
+    except IntegrityError:
+        logger.debug(f"Resume embedding already stored: {content_hash[:12]}")
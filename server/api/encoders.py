@@ -0,0 +1,357 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+from . import metrics
+
+logger = logging.getLogger('api')
+
+# Inference backends for the sentence encoder. All of them take the loaded
+# fp32 SentenceTransformer as their starting point and return L2-normalised
+# float32 embeddings, so scores stay comparable across backends.
+BACKEND_TORCH = 'torch'
+BACKEND_TORCH_INT8 = 'torch-int8'
+BACKEND_ONNX = 'onnx'
+
+BACKENDS = (BACKEND_TORCH, BACKEND_TORCH_INT8, BACKEND_ONNX)
+
+# A candidate backend is only used when every sample embedding has at
+# least this cosine similarity to its fp32 counterpart
+DEFAULT_MIN_SIMILARITY = 0.99
+
+# Exported ONNX graphs, one per model name
+DEFAULT_ONNX_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'model_cache', 'onnx')
+
+# Cross-request micro-batching: encode calls are gathered for up to this
+# many milliseconds, or until this many texts are waiting. A caller gives
+# up on its call after DEFAULT_MICROBATCH_TIMEOUT seconds.
+DEFAULT_MICROBATCH_WAIT_MS = 5
+DEFAULT_MICROBATCH_SIZE = 64
+DEFAULT_MICROBATCH_TIMEOUT = 120
+
+SAMPLES_FILE = os.path.join(os.path.dirname(__file__), 'data', 'encoder_samples.txt')
+
+
+def _normalize(embeddings):
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return (embeddings / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+class TorchEncoder:
+    """fp32 PyTorch inference through SentenceTransformer.encode"""
+    backend = BACKEND_TORCH
+
+    def __init__(self, model):
+        self.model = model
+
+    @property
+    def tokenizer(self):
+        return self.model.tokenizer
+
+    def encode(self, texts, batch_size):
+        return self.model.encode(
+            list(texts),
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        )
+
+
+class QuantizedTorchEncoder(TorchEncoder):
+    """
+    PyTorch inference with every Linear layer dynamically quantized to
+    int8 (weights stored as int8, activations quantized per batch). CPU only.
+    """
+    backend = BACKEND_TORCH_INT8
+
+    @classmethod
+    def from_model(cls, model):
+        import torch
+
+        # Returns a quantized copy; ``model`` is left untouched as the reference
+        quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return cls(quantized)
+
+
+class OnnxEncoder:
+    """
+    ONNX Runtime inference of the transformer, with the SentenceTransformer
+    tokenizer and pooling reproduced in numpy. The graph is exported from
+    the PyTorch model once and reused from ``onnx_dir`` afterwards.
+    """
+    backend = BACKEND_ONNX
+
+    def __init__(self, model, model_name, onnx_dir):
+        import onnxruntime
+
+        transformer, pooling = model[0], model[1]
+        if getattr(pooling, 'pooling_mode_mean_tokens', False):
+            self.pooling = 'mean'
+        elif getattr(pooling, 'pooling_mode_cls_token', False):
+            self.pooling = 'cls'
+        else:
+            raise ValueError("Only mean and CLS pooling are supported by the ONNX backend")
+
+        self.tokenizer = transformer.tokenizer
+        self.max_seq_length = model.max_seq_length
+        onnx_dir = onnx_dir or DEFAULT_ONNX_DIR
+        path = self._export(transformer, os.path.join(onnx_dir, f"{model_name.replace('/', '__')}.onnx"))
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            path, options, providers=['CPUExecutionProvider']
+        )
+        self.input_names = [node.name for node in self.session.get_inputs()]
+
+    def _export(self, transformer, path):
+        if os.path.exists(path):
+            return path
+
+        import torch
+
+        logger.info(f"Exporting sentence encoder to ONNX: {path}")
+        sample = self.tokenizer(["export the encoder graph"], return_tensors='pt')
+        input_names = list(sample.keys())
+        auto_model = transformer.auto_model
+
+        class TokenEmbeddings(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.auto_model = auto_model
+
+            def forward(self, *inputs):
+                return self.auto_model(**dict(zip(input_names, inputs)))[0]
+
+        dynamic_axes = {input_name: {0: 'batch', 1: 'sequence'} for input_name in input_names}
+        dynamic_axes['token_embeddings'] = {0: 'batch', 1: 'sequence'}
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Export next to the final path and rename, so concurrent processes
+        # never load a half-written graph
+        partial = f"{path}.{os.getpid()}.tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                TokenEmbeddings().eval(),
+                tuple(sample[input_name] for input_name in input_names),
+                partial,
+                input_names=input_names,
+                output_names=['token_embeddings'],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+            )
+        os.replace(partial, path)
+        return path
+
+    def encode(self, texts, batch_size):
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # Batch texts of similar length together to keep padding small
+        order = sorted(range(len(texts)), key=lambda index: len(texts[index]), reverse=True)
+        embeddings = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            encoded = self.tokenizer(
+                [texts[index] for index in batch],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors='np',
+            )
+            token_embeddings = self.session.run(
+                None, {name: encoded[name].astype(np.int64) for name in self.input_names}
+            )[0]
+            if self.pooling == 'cls':
+                pooled = token_embeddings[:, 0]
+            else:
+                mask = encoded['attention_mask'][..., None].astype(np.float32)
+                pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            for index, vector in zip(batch, _normalize(pooled)):
+                embeddings[index] = vector
+        return np.vstack(embeddings)
+
+
+class MicroBatchingEncoder:
+    """
+    Runs every encode call of the process on one worker thread that owns
+    ``encoder``. The worker takes the calls waiting in the queue, gathers
+    more for up to ``max_wait_ms`` until ``max_batch_size`` texts are
+    collected, and encodes them as one batch; each caller blocks on its own
+    future for its rows, for at most ``timeout`` seconds. Many small
+    concurrent requests thus share a few well-filled batches instead of
+    running tiny ones side by side.
+    """
+
+    def __init__(self, encoder, max_wait_ms=DEFAULT_MICROBATCH_WAIT_MS,
+                 max_batch_size=DEFAULT_MICROBATCH_SIZE, timeout=DEFAULT_MICROBATCH_TIMEOUT):
+        self.encoder = encoder
+        self.backend = encoder.backend
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self.timeout = timeout
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._worker = None
+
+    @property
+    def tokenizer(self):
+        return self.encoder.tokenizer
+
+    def encode(self, texts, batch_size):
+        texts = list(texts)
+        if not texts:
+            return self.encoder.encode(texts, batch_size)
+        future = Future()
+        with self._condition:
+            # is_alive() also catches a worker lost to a fork or to an error
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='ats-encoder', daemon=True)
+                self._worker.start()
+            self._queue.append((texts, batch_size, future))
+            self._condition.notify()
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Still queued: the worker skips it. Already encoding: the
+            # result is dropped.
+            future.cancel()
+            raise TimeoutError(f"Encoder did not return {len(texts)} embeddings within {self.timeout}s")
+
+    def _next_batch(self):
+        """Wait for pending calls and gather them into one batch"""
+        with self._condition:
+            batch = []
+            size = 0
+            deadline = None
+            while size < self.max_batch_size:
+                if self._queue:
+                    call = self._queue.popleft()
+                    # False for calls their caller gave up on
+                    if call[2].set_running_or_notify_cancel():
+                        batch.append(call)
+                        size += len(call[0])
+                    continue
+                if not batch:
+                    self._condition.wait()
+                    continue
+                if deadline is None:
+                    deadline = time.monotonic() + self.max_wait
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._encode_batch(batch)
+            finally:
+                # Whatever went wrong, no caller is left waiting on this batch
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("Encoder worker stopped before finishing the call"))
+
+    def _encode_batch(self, batch):
+        texts = [text for call_texts, _, _ in batch for text in call_texts]
+        metrics.ENCODER_BATCH_TEXTS.observe(len(texts))
+        metrics.ENCODER_BATCH_CALLS.observe(len(batch))
+        try:
+            embeddings = self.encoder.encode(texts, max(call[1] for call in batch))
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][2].set_exception(e)
+                return
+            # Encode the calls one by one, so only the failing one gets the error
+            logger.warning(f"Micro-batched encode of {len(batch)} calls failed, retrying each: {str(e)}")
+            for call_texts, batch_size, future in batch:
+                try:
+                    future.set_result(self.encoder.encode(call_texts, batch_size))
+                except Exception as call_error:
+                    future.set_exception(call_error)
+            return
+        offsets = np.cumsum([len(call_texts) for call_texts, _, _ in batch])[:-1]
+        for (_, _, future), rows in zip(batch, np.split(np.asarray(embeddings), offsets)):
+            future.set_result(rows)
+
+
+def load_samples():
+    from .semantic_matcher import get_text_cleaner
+    from .term_matching import load_terms
+
+    cleaner = get_text_cleaner()
+    return [cleaner.clean_text(sample) for sample in load_terms(SAMPLES_FILE)]
+
+
+def compare_encoders(candidate, reference, texts, batch_size=32):
+    """
+    Cosine similarity between the candidate's and the reference's
+    embeddings of each text; both are normalised so it is a row-wise dot.
+    """
+    similarities = np.sum(
+        candidate.encode(texts, batch_size) * reference.encode(texts, batch_size), axis=1
+    )
+    return {
+        'samples': len(texts),
+        'min_similarity': round(float(similarities.min()), 5),
+        'mean_similarity': round(float(similarities.mean()), 5),
+    }
+
+
+def build_encoder(model, model_name, backend=BACKEND_TORCH, device='cpu', verify=True,
+                  min_similarity=DEFAULT_MIN_SIMILARITY, onnx_dir=None):
+    """
+    Wrap the loaded fp32 SentenceTransformer ``model`` in the requested
+    backend. Unless ``verify`` is off, a non-fp32 backend is checked against
+    fp32 on the bundled sample texts first. The fp32 encoder is returned
+    whenever the backend is unavailable, fails to build, runs on GPU, or
+    falls below ``min_similarity``.
+
+    Returns (encoder, report), where report describes the comparison.
+    """
+    reference = TorchEncoder(model)
+    report = {'requested': backend}
+    if backend == BACKEND_TORCH:
+        return reference, report
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown encoder backend '{backend}'; using {BACKEND_TORCH}")
+        report['fallback_reason'] = 'unknown backend'
+        return reference, report
+    if device != 'cpu':
+        logger.info(f"Encoder backend '{backend}' is CPU only; using {BACKEND_TORCH} on {device}")
+        report['fallback_reason'] = f'device {device}'
+        return reference, report
+
+    try:
+        if backend == BACKEND_TORCH_INT8:
+            candidate = QuantizedTorchEncoder.from_model(model)
+        else:
+            candidate = OnnxEncoder(model, model_name, onnx_dir)
+    except ImportError as e:
+        logger.warning(f"Encoder backend '{backend}' unavailable ({str(e)}); using {BACKEND_TORCH}")
+        report['fallback_reason'] = 'not installed'
+        return reference, report
+    except Exception as e:
+        logger.error(f"Failed to build encoder backend '{backend}': {str(e)}")
+        report['fallback_reason'] = str(e)
+        return reference, report
+
+    if verify:
+        report.update(compare_encoders(candidate, reference, load_samples()))
+        if report['min_similarity'] < min_similarity:
+            logger.warning(
+                f"Encoder backend '{backend}' min cosine similarity to fp32 "
+                f"{report['min_similarity']} < {min_similarity}; using {BACKEND_TORCH}"
+            )
+            report['fallback_reason'] = 'accuracy'
+            return reference, report
+
+    logger.info(f"Using encoder backend '{backend}' ({report})")
+    return candidate, report
@@ -0,0 +1,319 @@
+import io
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, CancelledError, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from queue import Empty
+
+from django.conf import settings
+
+logger = logging.getLogger('api')
+
+PDF_CONTENT_TYPE = 'application/pdf'
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+SUPPORTED_CONTENT_TYPES = (PDF_CONTENT_TYPE, DOCX_CONTENT_TYPE)
+
+DEFAULT_PARSE_WORKERS = 4
+DEFAULT_PARSE_TIMEOUT = 30
+
+
+# Extraction. These run inside pool workers, so they must stay importable
+# without Django and only take picklable arguments. ``source`` is either
+# the file's bytes or a path to it on disk.
+
+def extract_text_from_pdf(source):
+    """Extract text from a PDF"""
+    import pymupdf  # PyMuPDF
+
+    if isinstance(source, (bytes, bytearray)):
+        doc = pymupdf.open(stream=source, filetype='pdf')
+    else:
+        doc = pymupdf.open(source)
+    try:
+        return "".join(page.get_text() for page in doc)
+    finally:
+        doc.close()
+
+
+def extract_text_from_docx(source):
+    """Extract text from a DOCX"""
+    import docx
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    doc = docx.Document(source)
+    return "".join(paragraph.text + "\n" for paragraph in doc.paragraphs)
+
+
+def extract_text(source, content_type):
+    """Extract text from a file based on its content type"""
+    if content_type == PDF_CONTENT_TYPE:
+        return extract_text_from_pdf(source)
+    if content_type == DOCX_CONTENT_TYPE:
+        return extract_text_from_docx(source)
+    raise ValueError(f"Unsupported file type: {content_type}")
+
+
+def _upload_source(file):
+    """
+    The path of an upload Django already spooled to disk
+    (TemporaryUploadedFile), otherwise its bytes; nothing is written out.
+    """
+    if hasattr(file, 'temporary_file_path'):
+        return file.temporary_file_path()
+    data = file.read()
+    file.seek(0)
+    return data
+
+
+def parse_upload(file):
+    """Parse one uploaded file in the calling thread. Returns "" on failure."""
+    if file.content_type not in SUPPORTED_CONTENT_TYPES:
+        logger.warning(f"Unsupported file type: {file.content_type}")
+        return ""
+    try:
+        return extract_text(_upload_source(file), file.content_type)
+    except Exception as e:
+        logger.error(f"File parsing error for {file.name}: {str(e)}")
+        return ""
+
+
+# Process pool
+
+_pool = None
+_pool_lock = threading.Lock()
+_task_ids = itertools.count()
+
+# Set in each pool worker by _init_worker
+_started_queue = None
+
+
+def _init_worker(started_queue):
+    global _started_queue
+    _started_queue = started_queue
+
+
+def _extract_in_worker(task_id, source, content_type):
+    """extract_text, reporting to the parent when a worker picks the file up"""
+    _started_queue.put((task_id, os.getpid(), time.time()))
+    return extract_text(source, content_type)
+
+
+class _ParsePool:
+    """
+    A ProcessPoolExecutor whose workers report when they start each file,
+    so a file's timeout runs from then rather than while it is still
+    queued behind other requests' files, and so the worker stuck on it can
+    be found and terminated.
+    """
+
+    def __init__(self, workers):
+        # spawn: forking a process that already holds torch/BLAS threads
+        # can deadlock the child
+        context = multiprocessing.get_context('spawn')
+        self.started_queue = context.Queue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.started_queue,),
+        )
+        # Set once a worker of this pool has been terminated for a timeout
+        self.killed_worker = False
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def submit(self, task_id, source, content_type):
+        return self.executor.submit(_extract_in_worker, task_id, source, content_type)
+
+    def started(self, task_id):
+        """(worker pid, wall-clock start) of a task once a worker has it, else None"""
+        with self._lock:
+            while True:
+                try:
+                    reported_id, pid, started_at = self.started_queue.get_nowait()
+                except (Empty, OSError, ValueError):
+                    break
+                self._started[reported_id] = (pid, started_at)
+            return self._started.get(task_id)
+
+    def forget(self, task_id):
+        with self._lock:
+            self._started.pop(task_id, None)
+
+    def kill(self, task_id):
+        """
+        Terminate the worker running ``task_id``. The executor then counts
+        as broken, and the other files it was running or holding fail with
+        BrokenProcessPool and are re-queued by their requests.
+        """
+        self.killed_worker = True
+        pid = (self.started(task_id) or (None,))[0]
+        process = (getattr(self.executor, '_processes', None) or {}).get(pid)
+        if process is not None and process.is_alive():
+            process.terminate()
+        else:
+            _discard_pool(self)
+
+
+def get_parse_workers():
+    return getattr(settings, 'ATS_PARSE_WORKERS', DEFAULT_PARSE_WORKERS)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _ParsePool(get_parse_workers())
+        return _pool
+
+
+def worker_pids():
+    """Process ids of the live parse pool workers (none before first use)"""
+    with _pool_lock:
+        pool = _pool
+    if pool is None:
+        return []
+    processes = getattr(pool.executor, '_processes', None) or {}
+    return [pid for pid, process in list(processes.items()) if process.is_alive()]
+
+
+def _discard_pool(pool):
+    """Replace a broken pool; its worker processes are terminated."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.executor.shutdown(wait=False, cancel_futures=True)
+    for process in list((getattr(pool.executor, '_processes', None) or {}).values()):
+        if process.is_alive():
+            process.terminate()
+
+
+def parse_uploads(uploads, timeout=None):
+    """
+    Parse ``uploads``, an iterable of (key, UploadedFile), in the parse
+    process pool and yield (key, text) pairs as each file finishes.
+
+    Each file gets ``timeout`` seconds (ATS_PARSE_TIMEOUT) from when a
+    worker picks it up. A file that times out, fails, or takes its worker
+    down yields "" without affecting the others: only the worker of a hung
+    file is terminated, files caught in a crashed pool are retried once,
+    one at a time, in a fresh one, and files lost because another file hung
+    are re-queued.
+    With ATS_PARSE_WORKERS = 0 files are parsed inline.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'ATS_PARSE_TIMEOUT', DEFAULT_PARSE_TIMEOUT)
+
+    if get_parse_workers() <= 0:
+        for key, file in uploads:
+            yield key, parse_upload(file)
+        return
+
+    staged = {}
+    for key, file in uploads:
+        if file.content_type not in SUPPORTED_CONTENT_TYPES:
+            logger.warning(f"Unsupported file type: {file.content_type}")
+            yield key, ""
+            continue
+        try:
+            staged[key] = (file.name, file.content_type, _upload_source(file))
+        except Exception as e:
+            logger.error(f"File read error for {file.name}: {str(e)}")
+            yield key, ""
+
+    yield from _run_in_pool(staged, timeout)
+
+
+# How often unstarted files are checked for a worker picking them up
+START_POLL_INTERVAL = 0.1
+
+
+def _run_in_pool(staged, timeout):
+    crashes = {key: 0 for key in staged}
+    queue = list(staged)
+    submit_failures = 0
+
+    while queue:
+        # Files caught in a crashed pool are retried on their own once the
+        # rest are done, so a second crash is pinned on the file causing it
+        batch = [key for key in queue if not crashes[key]] or queue[:1]
+        pool = _get_pool()
+        try:
+            pending = {}
+            for key in batch:
+                task_id = next(_task_ids)
+                pending[pool.submit(task_id, staged[key][2], staged[key][1])] = (key, task_id)
+        except (BrokenProcessPool, RuntimeError):
+            # Usually broken by a crash in another request's batch; give up
+            # if a fresh pool cannot take work either.
+            for future in pending:
+                future.cancel()
+            _discard_pool(pool)
+            submit_failures += 1
+            if submit_failures > 1:
+                logger.error("Parse pool unavailable")
+                for key in queue:
+                    yield key, ""
+                return
+            continue
+        queue = [key for key in queue if key not in batch]
+        broken = False
+
+        while pending:
+            now = time.time()
+            deadlines = {}
+            for future, (key, task_id) in pending.items():
+                started = pool.started(task_id)
+                if started is not None:
+                    deadlines[future] = started[1] + timeout
+            wait_for = min((deadline - now for deadline in deadlines.values()), default=timeout)
+            if len(deadlines) < len(pending):
+                wait_for = min(wait_for, START_POLL_INTERVAL)
+            done, _ = wait(pending, timeout=max(wait_for, 0.05), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                key, task_id = pending.pop(future)
+                pool.forget(task_id)
+                name = staged[key][0]
+                try:
+                    yield key, future.result()
+                except CancelledError:
+                    # Dropped with a pool another request discarded
+                    queue.append(key)
+                except BrokenProcessPool:
+                    broken = True
+                    if pool.killed_worker:
+                        # Lost because a hung file's worker was terminated
+                        queue.append(key)
+                        continue
+                    crashes[key] += 1
+                    if crashes[key] < 2:
+                        queue.append(key)
+                    else:
+                        logger.error(f"Parse worker crashed on {name}")
+                        yield key, ""
+                except Exception as e:
+                    logger.error(f"File parsing error for {name}: {str(e)}")
+                    yield key, ""
+
+            now = time.time()
+            for future, deadline in deadlines.items():
+                if deadline > now or future not in pending:
+                    continue
+                key, task_id = pending.pop(future)
+                logger.error(f"File parsing timed out after {timeout}s: {staged[key][0]}")
+                yield key, ""
+                # Only the worker stuck on this file is terminated; the
+                # files lost with it come back through BrokenProcessPool
+                pool.kill(task_id)
+                pool.forget(task_id)
+
+        if broken:
+            _discard_pool(pool)
@@ -0,0 +1,57 @@
+import hashlib
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+from django.core.cache import caches
+
+from . import metrics
+from .job_matcher import term_counts
+
+logger = logging.getLogger('api')
+
+# Alias of the size-bounded cache in settings.CACHES holding JD artifacts
+JD_CACHE_ALIAS = 'jd_artifacts'
+
+
+@dataclass(frozen=True, eq=False)
+class JobDescriptionArtifacts:
+    """Everything the scoring pipeline derives from a job description alone."""
+    digest: str
+    cleaned_text: str
+    embedding: np.ndarray
+    term_counts: dict
+
+
+def jd_digest(jd_text):
+    """SHA-256 of the extracted job description text."""
+    return hashlib.sha256(jd_text.encode('utf-8')).hexdigest()
+
+
+def get_jd_artifacts(jd_text, ats):
+    """
+    Return the cleaned text, embedding and TF-IDF term counts of
+    ``jd_text``, computing and caching them on first sight. Entries are
+    namespaced by the encoder model and backend so embeddings never mix across models.
+    """
+    digest = jd_digest(jd_text)
+    cache = caches[JD_CACHE_ALIAS]
+    key = f"jd:{ats.encoder_key}:{digest}"
+
+    artifacts = cache.get(key)
+    if artifacts is not None:
+        logger.debug(f"JD artifact cache hit: {digest[:12]}")
+        metrics.record_cache('jd_artifacts', 1, 0)
+        return artifacts
+
+    logger.debug(f"JD artifact cache miss: {digest[:12]}")
+    metrics.record_cache('jd_artifacts', 0, 1)
+    cleaned_text = ats.clean_jd(jd_text)
+    artifacts = JobDescriptionArtifacts(
+        digest=digest,
+        cleaned_text=cleaned_text,
+        embedding=ats.encode([cleaned_text])[0],
+        term_counts=dict(term_counts(jd_text)),
+    )
+    cache.set(key, artifacts)
+    return artifacts
@@ -1,38 +1,202 @@
+import math
+import os
 import re
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from collections import Counter
+import functools
+import numpy as np
+
+from .term_matching import DATA_DIR, get_matcher, load_terms
+
+@functools.lru_cache(maxsize=None)
+def _analyzer():
+    """Tokenizer/stop-word analyzer of the TfidfVectorizer used for keyword matching"""
+    # sklearn is imported on first use to keep module import cheap
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    return TfidfVectorizer(stop_words='english').build_analyzer()
+
+# Smoothed idf of a term found in only one of the two documents being compared
+# (a term in both gets ln(3/3) + 1 == 1)
+_IDF_SINGLE_DOC = math.log(3 / 2) + 1
+
+CERTIFICATIONS_FILE = os.path.join(DATA_DIR, 'certifications.txt')
+CERTIFICATIONS = load_terms(CERTIFICATIONS_FILE)
+COMMUNICATION_TERMS = ["lead", "managed", "communicated", "presented", "negotiated"]
+
+_EXPERIENCE_PATTERN = re.compile(r'([0-9]+)\s+years?', re.IGNORECASE)
+# Whole-word, case-insensitive matchers, each compiled once
+_certification_matcher = get_matcher(tuple(CERTIFICATIONS))
+_communication_matcher = get_matcher(tuple(COMMUNICATION_TERMS))
 
 def compute_experience_score(text):
-    years_match = re.search(r'([0-9]+)\s+years?', text, re.IGNORECASE)
+    years_match = _EXPERIENCE_PATTERN.search(text)
     return int(years_match.group(1)) if years_match else 0
 
-def compute_keyword_match(text, job_desc):
-    vectorizer = TfidfVectorizer(stop_words='english')
-    tfidf_matrix = vectorizer.fit_transform([text, job_desc])
-    return cosine_similarity(tfidf_matrix[0], tfidf_matrix[1])[0][0] * 100
+def term_counts(text):
+    """Term frequencies of ``text`` as seen by the keyword TF-IDF analyzer."""
+    return Counter(_analyzer()(text))
+
+def compute_keyword_match(text, job_desc, jd_terms=None):
+    """
+    TF-IDF cosine similarity (0-100) of ``text`` and ``job_desc``, identical
+    to fitting a TfidfVectorizer on the pair. ``jd_terms`` are the cached
+    term_counts of the job description.
+    """
+    if jd_terms is None:
+        jd_terms = term_counts(job_desc)
+    resume_terms = term_counts(text)
+    dot = sum(count * jd_terms[term] for term, count in resume_terms.items() if term in jd_terms)
+    if not dot:
+        return 0.0
+    resume_norm = math.sqrt(sum(
+        (count if term in jd_terms else count * _IDF_SINGLE_DOC) ** 2
+        for term, count in resume_terms.items()
+    ))
+    jd_norm = math.sqrt(sum(
+        (count if term in resume_terms else count * _IDF_SINGLE_DOC) ** 2
+        for term, count in jd_terms.items()
+    ))
+    return dot / (resume_norm * jd_norm) * 100
+
+# Per-role weights of the component scores, in COMPONENTS order
+COMPONENTS = ["experience", "keyword_match", "certifications", "communication", "project_relevance"]
+ROLE_WEIGHTS = {
+    "Software Engineer": [0.0, 0.5, 0.0, 0.5, 0.0],
+    "Data Scientist": [0.0, 0.5, 0.0, 0.5, 0.0],
+    "Sales Manager": [0.5, 0.0, 0.0, 0.5, 0.0],
+    "HR Manager": [0.1, 0.3, 0.15, 0.2, 0.25]
+}
 
 def compute_certifications_score(text):
-    certifications = ["PMP", "AWS Certified", "Scrum Master", "Six Sigma"]
-    return sum(cert in text for cert in certifications) * 10
+    return len(_certification_matcher.counts(text)) * 10
 
 def compute_communication_score(text):
-    return min(len(re.findall(r'\b(lead|managed|communicated|presented|negotiated)\b', text, re.IGNORECASE)) * 5, 100)
-
-def compute_project_relevance(text, job_desc):
-    return compute_keyword_match(text, job_desc) * 0.5
-
-def compute_final_score(text, job_desc, job_role):
-    weights = {
-        "Software Engineer": [0.0, 0.5, 0.0, 0.5, 0.0],
-        "Data Scientist": [0.0, 0.5, 0.0, 0.5, 0.0],
-        "Sales Manager": [0.5, 0.0, 0.0, 0.5, 0.0],
-        "HR Manager": [0.1, 0.3, 0.15, 0.2, 0.25]
-    }
+    return min(sum(_communication_matcher.counts(text).values()) * 5, 100)
+
+def compute_project_relevance(text, job_desc, jd_terms=None):
+    return compute_keyword_match(text, job_desc, jd_terms) * 0.5
+
+def compute_final_score(text, job_desc, job_role, jd_terms=None):
+    keyword_match = compute_keyword_match(text, job_desc, jd_terms)
     scores = [
         compute_experience_score(text),
-        compute_keyword_match(text, job_desc),
+        keyword_match,
         compute_certifications_score(text),
         compute_communication_score(text),
-        compute_project_relevance(text, job_desc)
+        keyword_match * 0.5  # project relevance
     ]
-    return sum(w * s for w, s in zip(weights[job_role], scores))
\ No newline at end of file
+    return sum(w * s for w, s in zip(ROLE_WEIGHTS[job_role], scores))
+
+
+# Batch scoring: one resume per row, one JD for the whole batch.
+# Every function below returns the same values as its single-text
+# counterpart above, computed in one pass over the batch.
+
+# Never produced by PDF/DOCX extraction, and neither a word nor a space
+# character, so regex matches and \b boundaries cannot cross documents
+_DOC_SEPARATOR = '\x00'
+
+def _join_documents(texts):
+    """Concatenate texts into one string plus each document's start offset."""
+    texts = [text.replace(_DOC_SEPARATOR, '\x01') for text in texts]
+    lengths = np.fromiter((len(text) + 1 for text in texts), dtype=np.int64, count=len(texts))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return _DOC_SEPARATOR.join(texts), starts
+
+def _matches_by_document(pattern, joined, starts):
+    """All matches of ``pattern`` in ``joined`` with the document index of each."""
+    matches = list(pattern.finditer(joined))
+    positions = np.fromiter((match.start() for match in matches), dtype=np.int64, count=len(matches))
+    return matches, np.searchsorted(starts, positions, side='right') - 1
+
+def compute_experience_scores(texts):
+    joined, starts = _join_documents(texts)
+    matches, docs = _matches_by_document(_EXPERIENCE_PATTERN, joined, starts)
+    scores = np.zeros(len(texts))
+    seen = np.zeros(len(texts), dtype=bool)
+    for match, doc in zip(matches, docs):
+        if not seen[doc]:
+            seen[doc] = True
+            scores[doc] = int(match.group(1))
+    return scores
+
+def compute_keyword_matches(texts, job_desc, jd_terms=None):
+    """
+    compute_keyword_match for every text, from one CountVectorizer fit over
+    the batch and sparse matrix-vector products against the JD term vector.
+    """
+    if jd_terms is None:
+        jd_terms = term_counts(job_desc)
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    vectorizer = CountVectorizer(analyzer=_analyzer())
+    try:
+        counts = vectorizer.fit_transform(texts).astype(np.float64)
+    except ValueError:  # no terms in any resume
+        return np.zeros(len(texts))
+
+    jd_vector = np.zeros(counts.shape[1])
+    for term, count in jd_terms.items():
+        index = vectorizer.vocabulary_.get(term)
+        if index is not None:
+            jd_vector[index] = count
+    jd_total_sq = float(sum(count * count for count in jd_terms.values()))
+
+    # A term present in both documents has idf 1, otherwise _IDF_SINGLE_DOC.
+    idf_sq = _IDF_SINGLE_DOC ** 2
+    dot = counts @ jd_vector
+    counts_sq = counts.multiply(counts)
+    resume_sq = idf_sq * np.asarray(counts_sq.sum(axis=1)).ravel() - (idf_sq - 1) * (counts_sq @ (jd_vector > 0))
+    present = (counts > 0).astype(np.float64)
+    jd_sq = idf_sq * jd_total_sq - (idf_sq - 1) * (present @ (jd_vector * jd_vector))
+
+    scores = np.zeros(len(texts))
+    nonzero = dot > 0
+    scores[nonzero] = dot[nonzero] / np.sqrt(resume_sq[nonzero] * jd_sq[nonzero]) * 100
+    return scores
+
+def compute_certifications_scores(texts):
+    joined, starts = _join_documents(texts)
+    matches, docs = _matches_by_document(_certification_matcher.pattern, joined, starts)
+    found = {(doc, _certification_matcher.term_of(match)) for match, doc in zip(matches, docs)}
+    counts = np.bincount([doc for doc, _ in found], minlength=len(texts))
+    return (counts * 10).astype(np.float64)
+
+def compute_communication_scores(texts):
+    joined, starts = _join_documents(texts)
+    _, docs = _matches_by_document(_communication_matcher.pattern, joined, starts)
+    counts = np.bincount(docs, minlength=len(texts))
+    return np.minimum(counts * 5, 100).astype(np.float64)
+
+def compute_component_scores(texts, job_desc, jd_terms=None, experience_years=None):
+    """
+    (n, len(COMPONENTS)) matrix of raw component scores for ``texts``.
+    ``experience_years`` (e.g. from the NER stage's date ranges) fills in
+    the experience score of resumes that never state "N years".
+    """
+    if not texts:
+        return np.zeros((0, len(COMPONENTS)))
+    keyword_matches = compute_keyword_matches(texts, job_desc, jd_terms)
+    experience = compute_experience_scores(texts)
+    if experience_years is not None:
+        experience = np.where(experience > 0, experience, np.asarray(experience_years, dtype=np.float64))
+    return np.column_stack([
+        experience,
+        keyword_matches,
+        compute_certifications_scores(texts),
+        compute_communication_scores(texts),
+        keyword_matches * 0.5,
+    ])
+
+def weight_components(components, job_role):
+    """Final keyword scores of an (n, len(COMPONENTS)) component matrix for ``job_role``."""
+    return np.asarray(components, dtype=np.float64).reshape(-1, len(COMPONENTS)) @ np.array(ROLE_WEIGHTS[job_role])
+
+def compute_final_scores(texts, job_desc, job_role, jd_terms=None, experience_years=None,
+                         return_components=False):
+    """
+    Batch variant of compute_final_score; returns an array of scores, or
+    with ``return_components`` (scores, component matrix).
+    """
+    components = compute_component_scores(texts, job_desc, jd_terms, experience_years)
+    scores = weight_components(components, job_role)
+    return (scores, components) if return_components else scores
@@ -0,0 +1,219 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import admission, batch_store
+from .models import ScoringJob, ScoringJobFile
+from .scoring import ResumeScorer, rank_results
+
+logger = logging.getLogger('api')
+
+DEFAULT_JOB_WORKERS = 2
+DEFAULT_JOB_CHUNK_SIZE = 32
+DEFAULT_JOB_POLL_INTERVAL = 5
+DEFAULT_JOB_STALE_AFTER = 600
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def submit_job(user, resume_files, jd_text, job_role, keyword_weight):
+    """Queue uploaded resumes for background scoring and return the job"""
+    with transaction.atomic():
+        job = ScoringJob.objects.create(
+            user=user,
+            job_role=job_role,
+            keyword_weight=keyword_weight,
+            jd_text=jd_text,
+            total_files=len(resume_files),
+        )
+        ScoringJobFile.objects.bulk_create([
+            ScoringJobFile(
+                job=job,
+                position=position,
+                name=resume_file.name,
+                content_type=resume_file.content_type,
+                content=resume_file.read(),
+            )
+            for position, resume_file in enumerate(resume_files)
+        ])
+    start_workers()
+    _wakeup.set()
+    logger.info(f"Queued scoring job {job.pk} with {job.total_files} resumes for user: {user.email}")
+    return job
+
+
+def _claimable():
+    """Queued jobs, plus running jobs whose worker stopped heartbeating"""
+    stale_before = timezone.now() - timedelta(seconds=_setting('ATS_JOB_STALE_AFTER', DEFAULT_JOB_STALE_AFTER))
+    return Q(status=ScoringJob.STATUS_QUEUED) | Q(status=ScoringJob.STATUS_RUNNING, updated_at__lt=stale_before)
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest claimable job to running. The conditional
+    UPDATE makes the claim safe across threads and processes.
+    """
+    candidates = ScoringJob.objects.filter(_claimable()).values_list('pk', flat=True)[:5]
+    for pk in candidates:
+        now = timezone.now()
+        claimed = ScoringJob.objects.filter(_claimable(), pk=pk).update(
+            status=ScoringJob.STATUS_RUNNING,
+            processed_files=0,
+            results=[],
+            error='',
+            started_at=now,
+            updated_at=now,
+        )
+        if claimed:
+            return ScoringJob.objects.get(pk=pk)
+    return None
+
+
+@contextmanager
+def _heartbeat(job):
+    """
+    Refresh the job's updated_at from a side thread while the block runs,
+    so a chunk waiting on admission control (or slow to score) is not
+    taken for abandoned and claimed by a second worker
+    """
+    stop = threading.Event()
+    interval = max(1, _setting('ATS_JOB_STALE_AFTER', DEFAULT_JOB_STALE_AFTER) / 4)
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                try:
+                    ScoringJob.objects.filter(pk=job.pk, status=ScoringJob.STATUS_RUNNING).update(
+                        updated_at=timezone.now()
+                    )
+                except Exception as e:
+                    logger.error(f"Scoring job {job.pk} heartbeat error: {str(e)}")
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"ats-job-heartbeat-{job.pk}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job):
+    """Score a claimed job chunk by chunk, publishing ranked partial results"""
+    logger.info(f"Starting scoring job {job.pk}")
+    with _heartbeat(job):
+        _run_job(job)
+
+
+def _run_job(job):
+    chunk_size = _setting('ATS_JOB_CHUNK_SIZE', DEFAULT_JOB_CHUNK_SIZE)
+    try:
+        # The job's results are searchable as the batch with the job's id
+        batch = batch_store.create_batch(
+            job.user, job.job_role, job.keyword_weight, job.jd_text, batch_id=job.pk
+        )
+        scorer = ResumeScorer(job.jd_text, job.job_role, job.keyword_weight, batch=batch)
+        positions = list(job.files.values_list('position', flat=True))
+        results = []
+        processed = 0
+        for start in range(0, len(positions), chunk_size):
+            rows = job.files.filter(position__in=positions[start:start + chunk_size])
+            uploads = [
+                SimpleUploadedFile(row.name, bytes(row.content), content_type=row.content_type)
+                for row in rows
+            ]
+            # Shares the scoring budget with synchronous requests, waiting as long as needed
+            with admission.admit(job.user_id, len(uploads), timeout=None):
+                results.extend(scorer.score_files(uploads, rerank=False))
+            processed += len(uploads)
+            ScoringJob.objects.filter(pk=job.pk).update(
+                processed_files=processed,
+                results=rank_results(results),
+                updated_at=timezone.now(),
+            )
+
+        # Two-stage ranking: re-score the best screened resumes of the whole job
+        with admission.admit(job.user_id, min(len(results), scorer.rerank_top_k), timeout=None):
+            reranked = scorer.rerank()
+        now = timezone.now()
+        update = {'results': rank_results(results)} if reranked else {}
+        ScoringJob.objects.filter(pk=job.pk).update(
+            status=ScoringJob.STATUS_COMPLETED, finished_at=now, updated_at=now, **update
+        )
+        job.files.all().delete()
+        logger.info(f"Finished scoring job {job.pk}: {len(results)} resumes scored")
+    except Exception as e:
+        logger.error(f"Scoring job {job.pk} failed: {str(e)}")
+        now = timezone.now()
+        ScoringJob.objects.filter(pk=job.pk).update(
+            status=ScoringJob.STATUS_FAILED, error=str(e), finished_at=now, updated_at=now
+        )
+        # A failed job is not retried, so its uploads are not needed any more
+        try:
+            job.files.all().delete()
+        except Exception as e:
+            logger.error(f"Could not delete files of scoring job {job.pk}: {str(e)}")
+
+
+# Worker pool
+
+_wakeup = threading.Event()
+_workers = []
+_workers_lock = threading.Lock()
+
+
+def _worker_loop():
+    poll_interval = _setting('ATS_JOB_POLL_INTERVAL', DEFAULT_JOB_POLL_INTERVAL)
+    while True:
+        try:
+            close_old_connections()
+            job = claim_next_job()
+            if job is not None:
+                run_job(job)
+                continue
+        except Exception as e:
+            logger.error(f"Job worker error: {str(e)}")
+        finally:
+            close_old_connections()
+        # Idle: wait for a local submit, or poll for jobs queued elsewhere
+        _wakeup.wait(poll_interval)
+        _wakeup.clear()
+
+
+def start_workers():
+    """Start the in-process job workers (ATS_JOB_WORKERS), replacing any that are no longer alive"""
+    with _workers_lock:
+        _workers[:] = [worker for worker in _workers if worker.is_alive()]
+        missing = _setting('ATS_JOB_WORKERS', DEFAULT_JOB_WORKERS) - len(_workers)
+        if missing <= 0:
+            return
+        for _ in range(missing):
+            worker = threading.Thread(target=_worker_loop, name=f"ats-job-worker-{len(_workers)}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+        logger.info(f"Started {missing} scoring job workers")
+
+
+def _restart_workers_after_fork():
+    # Threads do not survive a fork (e.g. gunicorn --preload), so a child of
+    # a process that ran workers starts its own
+    global _workers_lock
+    _workers_lock = threading.Lock()
+    if _workers:
+        start_workers()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_workers_after_fork)
@@ -0,0 +1,176 @@
+import logging
+import re
+
+from django.db import DatabaseError, connection
+
+from .models import BatchResume
+
+logger = logging.getLogger('api')
+
+# SQLite FTS5 table (created by migration 0005) holding the full text of
+# every BatchResume under its id, plus the batch id as a single token so a
+# query only ever intersects postings of its own batch. Its tokenizer keeps
+# '+' and '#' inside tokens (migration 0007), so c++, c# and c differ.
+FTS_TABLE = 'api_batchresume_fts'
+
+SNIPPET_MARKERS = ('**', '**')
+SNIPPET_TOKENS = 16
+
+# Quoted phrases, parentheses, commas, or bare terms (optionally prefix*)
+_QUERY_TOKEN = re.compile(r'"([^"]*)"|([(),])|([^\s(),"]+)')
+_OPERATORS = {'AND', 'OR', 'NOT'}
+
+_available = None
+
+
+class QuerySyntaxError(ValueError):
+    pass
+
+
+def is_available():
+    """True when the database is SQLite with the FTS5 index table"""
+    global _available
+    if _available is None:
+        _available = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _available
+
+
+def _batch_token(batch_id):
+    return str(batch_id).replace('-', '')
+
+
+def index_resumes(batch, rows):
+    """Add the full text of (BatchResume id, text) rows of ``batch`` to the index"""
+    if not is_available():
+        return
+    token = _batch_token(batch.pk)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, batch, text) VALUES (%s, %s, %s)",
+            [(pk, token, text) for pk, text in rows],
+        )
+
+
+def remove_batch(batch):
+    """Drop every indexed text of ``batch``"""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [f'batch : "{_batch_token(batch.pk)}"'],
+        )
+
+
+def parse_query(query):
+    """
+    Translate a keyword query into an FTS5 expression. Supports AND, OR,
+    NOT, parentheses, "quoted phrases" and prefix* terms; commas act as OR
+    and adjacent terms are ANDed; empty comma-separated operands ("a,,b",
+    "a,") are skipped. Every term is quoted, so user input can never
+    inject FTS5 syntax.
+
+    Returns (expression, terms) where terms maps each distinct keyword or
+    phrase, as typed, to its own FTS5 expression.
+    """
+    parts = []
+    terms = {}
+    depth = 0
+    expect_operand = True
+    # Set while the last part is the OR of a comma no operand has followed yet
+    trailing_comma = False
+    for phrase, punctuation, word in (match.groups() for match in _QUERY_TOKEN.finditer(query)):
+        comma = punctuation == ','
+        if comma:
+            if expect_operand:
+                continue
+            punctuation, word = None, 'OR'
+        if punctuation == ')' and trailing_comma:
+            parts.pop()
+            expect_operand = False
+        if word in _OPERATORS:
+            if expect_operand and word != 'NOT':
+                raise QuerySyntaxError(f"Unexpected operator {word}")
+            if word == 'NOT' and expect_operand:
+                # FTS5 NOT is binary: "a AND NOT b" is written "a NOT b"
+                if not parts or parts[-1] != 'AND':
+                    raise QuerySyntaxError("NOT must follow a term or AND")
+                parts.pop()
+            parts.append(word)
+            expect_operand = True
+        elif punctuation == '(':
+            if not expect_operand:
+                parts.append('AND')
+            parts.append('(')
+            depth += 1
+            expect_operand = True
+        elif punctuation == ')':
+            if expect_operand or depth == 0:
+                raise QuerySyntaxError("Unbalanced parentheses")
+            parts.append(')')
+            depth -= 1
+        else:
+            term = phrase if phrase is not None else word
+            prefix = phrase is None and term.endswith('*')
+            term = term.rstrip('*') if prefix else term
+            if not term.strip():
+                continue
+            if not expect_operand:
+                parts.append('AND')
+            term_expression = '"' + term.replace('"', '""') + '"' + ('*' if prefix else '')
+            parts.append(term_expression)
+            terms.setdefault(term + ('*' if prefix else ''), term_expression)
+            expect_operand = False
+        trailing_comma = comma
+    if trailing_comma:
+        parts.pop()
+        expect_operand = False
+    if depth or (parts and expect_operand):
+        raise QuerySyntaxError("Incomplete query")
+    if not terms:
+        raise QuerySyntaxError("No search terms")
+    return ' '.join(parts), terms
+
+
+def search(batch, query):
+    """
+    Full-text search of the resumes in ``batch``. Returns their stored
+    results, best score first, each with the matched keywords and a text
+    snippet around the first hit. Raises QuerySyntaxError on bad queries.
+    """
+    expression, terms = parse_query(query)
+    batch_filter = f'batch : "{_batch_token(batch.pk)}" AND '
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, snippet({FTS_TABLE}, 1, %s, %s, '…', %s) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s",
+                [*SNIPPET_MARKERS, SNIPPET_TOKENS, batch_filter + f'text : ({expression})'],
+            )
+            snippets = dict(cursor.fetchall())
+
+            # Which of the typed keywords each hit contains
+            matched = {pk: [] for pk in snippets}
+            if snippets:
+                for term, term_expression in terms.items():
+                    cursor.execute(
+                        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                        [batch_filter + f'text : ({term_expression})'],
+                    )
+                    for (pk,) in cursor.fetchall():
+                        if pk in matched:
+                            matched[pk].append(term)
+    except DatabaseError as e:
+        raise QuerySyntaxError(str(e))
+
+    results = []
+    for row in BatchResume.objects.filter(pk__in=snippets):
+        results.append({
+            **row.result,
+            'matchedKeywords': matched[row.pk],
+            'snippet': snippets[row.pk],
+        })
+    return sorted(results, key=lambda result: result.get('score', 0), reverse=True)
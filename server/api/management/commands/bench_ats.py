@@ -0,0 +1,376 @@
+import io
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import textwrap
+import time
+
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.file_parsing import DOCX_CONTENT_TYPE, PDF_CONTENT_TYPE, get_parse_workers, parse_uploads, worker_pids
+from api.job_matcher import (
+    CERTIFICATIONS, COMMUNICATION_TERMS, ROLE_WEIGHTS, compute_component_scores, term_counts,
+    weight_components,
+)
+from api.model_loader import get_ats_instance
+from api.pagination import PageRequest, page_results
+from api.scoring import ResumeScorer
+from api.semantic_matcher import SKILLS_FILE, get_text_cleaner
+from api.sections import ResumeSections
+from api.term_matching import load_terms
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ('parse', 'sections', 'cleaning', 'keyword', 'embedding', 'ranking', 'end_to_end')
+# Timed once per resume; the other stages are timed once per run (batch).
+# Parsing is timed per batch through the parse process pool, like uploads.
+PER_RESUME_STAGES = {'sections', 'cleaning'}
+
+FILLER = (
+    "delivered designed built improved owned reviewed migrated automated scaled "
+    "service platform pipeline feature team customer release system data api "
+    "performance reliability testing deployment product roadmap stakeholders "
+    "reduced latency cost increased revenue adoption quality across multiple"
+).split()
+
+
+def _percentile(samples, percent):
+    return float(np.percentile(samples, percent)) if samples else 0.0
+
+
+def _segment(text):
+    sections = ResumeSections(text)
+    sections.sections, sections.experience, sections.skills
+    return sections
+
+
+def _clean(cleaner, sections):
+    return cleaner.clean_text(sections.experience) + ' ' + cleaner.clean_text(' '.join(sections.skills))
+
+
+def _parse_all(files):
+    """Parse ``files`` in the parse pool (ATS_PARSE_WORKERS); texts in input order"""
+    texts = dict(parse_uploads(enumerate(files)))
+    return [texts[index] for index in range(len(files))]
+
+
+def _worker_peak_rss(pid):
+    """Peak RSS (VmHWM) of a live process in bytes, or None where /proc is unavailable"""
+    try:
+        with open(f'/proc/{pid}/status', encoding='ascii') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _peak_rss_bytes():
+    """
+    Peak resident set size of this process and of its parse pool workers.
+    RUSAGE_CHILDREN only covers children that have exited, and the pool
+    workers are still running, so their peaks are read from /proc (Linux)
+    and combined with those of any reaped children.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    reaped = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    live = [rss for rss in map(_worker_peak_rss, worker_pids()) if rss is not None]
+    return {
+        'self': own,
+        'parse_workers': len(live),
+        'parse_worker_max': max(live + [reaped]),
+        'parse_workers_total': sum(live),
+    }
+
+
+class SyntheticCorpus:
+    """Deterministic resumes and job description built from the repo's term lists"""
+
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.skills = load_terms(SKILLS_FILE)
+
+    def _sentences(self, words):
+        out = []
+        while sum(len(sentence.split()) for sentence in out) < words:
+            picked = self.random.sample(FILLER, 8) + self.random.sample(self.skills, 2)
+            if self.random.random() < 0.3:
+                picked.append(self.random.choice(COMMUNICATION_TERMS))
+            self.random.shuffle(picked)
+            out.append(' '.join(picked).capitalize() + '.')
+        return ' '.join(out)
+
+    def resume(self, index, words):
+        years = self.random.randint(0, 15)
+        skills = self.random.sample(self.skills, min(10, len(self.skills)))
+        certifications = self.random.sample(CERTIFICATIONS, 2)
+        return '\n'.join([
+            f"Candidate {index}",
+            "Summary",
+            self._sentences(max(words // 10, 10)),
+            "Experience",
+            f"Software engineer with {years} years of experience.",
+            self._sentences(max(words * 6 // 10, 10)),
+            "Projects",
+            self._sentences(max(words // 10, 10)),
+            "Certifications",
+            ', '.join(certifications),
+            "",
+            "Skills:",
+            ', '.join(skills),
+            "",
+            "Education",
+            "BSc Computer Science",
+        ])
+
+    def job_description(self, words):
+        return "Job Description\n" + self._sentences(words)
+
+
+def _pdf_bytes(text, lines_per_page=60):
+    import pymupdf
+
+    lines = []
+    for paragraph in text.split('\n'):
+        lines.extend(textwrap.wrap(paragraph, 90) or [''])
+    doc = pymupdf.open()
+    for start in range(0, len(lines), lines_per_page):
+        page = doc.new_page()
+        page.insert_text((50, 60), '\n'.join(lines[start:start + lines_per_page]), fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _docx_bytes(text):
+    import docx
+
+    document = docx.Document()
+    for line in text.split('\n'):
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the resume scoring pipeline on synthetic PDF/DOCX resumes: "
+        "per-stage latency (p50/p95), throughput and peak RSS, optionally "
+        "compared against a saved baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=50, help='Resumes per run')
+        parser.add_argument('--words', type=int, default=400, help='Approximate words per resume')
+        parser.add_argument('--jd-words', type=int, default=150, help='Approximate words in the job description')
+        parser.add_argument('--formats', default='pdf,docx', help='Comma-separated file formats to cycle through')
+        parser.add_argument('--repeat', type=int, default=3, help='Measured runs')
+        parser.add_argument('--warmup', type=int, default=1, help='Unmeasured runs before measuring')
+        parser.add_argument('--job-role', default='Software Engineer', choices=sorted(ROLE_WEIGHTS))
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--skip-end-to-end', action='store_true',
+                            help='Do not time ResumeScorer.score_files as a whole')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+        parser.add_argument('--output', help='Also write the JSON report to this file (e.g. to use as a baseline)')
+        parser.add_argument('--baseline', help='JSON report of an earlier run to compare against')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed p95 slowdown over the baseline, as a fraction')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error when a stage regressed beyond the tolerance')
+
+    def handle(self, *args, **options):
+        formats = [fmt.strip() for fmt in options['formats'].split(',') if fmt.strip()]
+        if not formats or set(formats) - {'pdf', 'docx'}:
+            raise CommandError("--formats takes pdf and/or docx")
+        if options['count'] < 1 or options['repeat'] < 1:
+            raise CommandError("--count and --repeat must be at least 1")
+
+        # Per-resume INFO logs would dominate the output and the timings
+        api_logger = logging.getLogger('api')
+        level = api_logger.level
+        if options['verbosity'] < 2:
+            api_logger.setLevel(logging.WARNING)
+        try:
+            report = self._run(formats, options)
+        finally:
+            api_logger.setLevel(level)
+
+        if options['baseline']:
+            report['comparison'] = self._compare(report, options['baseline'], options['tolerance'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print_report(report)
+
+        regressions = [
+            stage for stage, delta in report.get('comparison', {}).items() if delta['regression']
+        ]
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"Regression in: {', '.join(regressions)}")
+
+    def _run(self, formats, options):
+        corpus = SyntheticCorpus(options['seed'])
+        texts = [corpus.resume(index, options['words']) for index in range(options['count'])]
+        jd_text = corpus.job_description(options['jd_words'])
+        encoders = {'pdf': (_pdf_bytes, PDF_CONTENT_TYPE), 'docx': (_docx_bytes, DOCX_CONTENT_TYPE)}
+        documents = []
+        for index, text in enumerate(texts):
+            fmt = formats[index % len(formats)]
+            to_bytes, content_type = encoders[fmt]
+            documents.append((f"resume_{index}.{fmt}", to_bytes(text), content_type))
+
+        def uploads():
+            return [SimpleUploadedFile(name, data, content_type=content_type)
+                    for name, data, content_type in documents]
+
+        ats = get_ats_instance()
+        cleaner = get_text_cleaner()
+        jd_terms = term_counts(jd_text)
+        job_role = options['job_role']
+        samples = {stage: [] for stage in STAGES}
+        totals = dict.fromkeys(STAGES, 0.0)
+
+        def timed(stage, func, *args, record=True):
+            start = time.perf_counter()
+            value = func(*args)
+            elapsed = time.perf_counter() - start
+            if record:
+                samples[stage].append(elapsed)
+                totals[stage] += elapsed
+            return value
+
+        for run in range(options['warmup'] + options['repeat']):
+            record = run >= options['warmup']
+
+            parsed = timed('parse', _parse_all, uploads(), record=record)
+            sections = [timed('sections', _segment, text, record=record) for text in parsed]
+            cleaned = [timed('cleaning', _clean, cleaner, section, record=record) for section in sections]
+            components = timed('keyword', compute_component_scores, parsed, jd_text, jd_terms, record=record)
+            embeddings = timed('embedding', ats.encode, cleaned, record=record)
+            jd_embedding = ats.encode([cleaner.clean_text(jd_text)])[0]
+            timed('ranking', self._rank, documents, components, embeddings @ jd_embedding, job_role, record=record)
+
+            if not options['skip_end_to_end']:
+                # Rolled back so every run misses the embedding store like a fresh upload
+                with transaction.atomic():
+                    scorer = ResumeScorer(jd_text, job_role)
+                    timed('end_to_end', scorer.score_files, uploads(), record=record)
+                    transaction.set_rollback(True)
+
+        resumes = options['count'] * options['repeat']
+        stages = {}
+        for stage in STAGES:
+            if not samples[stage]:
+                continue
+            stages[stage] = {
+                'unit': 'resume' if stage in PER_RESUME_STAGES else 'batch',
+                'samples': len(samples[stage]),
+                'total_s': round(totals[stage], 4),
+                'p50_ms': round(_percentile(samples[stage], 50) * 1000, 3),
+                'p95_ms': round(_percentile(samples[stage], 95) * 1000, 3),
+                'resumes_per_s': round(resumes / totals[stage], 2) if totals[stage] else None,
+            }
+
+        return {
+            'config': {
+                'count': options['count'],
+                'words': options['words'],
+                'jd_words': options['jd_words'],
+                'formats': formats,
+                'repeat': options['repeat'],
+                'warmup': options['warmup'],
+                'job_role': job_role,
+                'seed': options['seed'],
+                'parse_workers': get_parse_workers(),
+            },
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'model': ats.model_name,
+                'backend': ats.backend,
+                'device': str(ats.device),
+            },
+            'stages': stages,
+            'peak_rss_bytes': _peak_rss_bytes(),
+        }
+
+    def _rank(self, documents, components, semantic_similarities, job_role, keyword_weight=0.5):
+        keyword_scores = weight_components(components, job_role)
+        semantic_scores = semantic_similarities * 100
+        final_scores = keyword_scores * keyword_weight + semantic_scores * (1 - keyword_weight)
+        results = [
+            {'resume': name, 'score': round(float(score))}
+            for (name, _, _), score in zip(documents, final_scores)
+        ]
+        return page_results(results, PageRequest())
+
+    def _compare(self, report, baseline_path, tolerance):
+        try:
+            with open(baseline_path, encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read baseline {baseline_path}: {str(e)}")
+
+        comparison = {}
+        for stage, current in report['stages'].items():
+            previous = baseline.get('stages', {}).get(stage)
+            if not previous or not previous.get('p95_ms'):
+                continue
+            ratio = current['p95_ms'] / previous['p95_ms']
+            comparison[stage] = {
+                'baseline_p95_ms': previous['p95_ms'],
+                'p95_ms': current['p95_ms'],
+                'change': round(ratio - 1, 4),
+                'regression': ratio > 1 + tolerance,
+            }
+        if baseline.get('config') != report['config']:
+            self.stderr.write(self.style.WARNING("Baseline was recorded with a different configuration"))
+        return comparison
+
+    def _print_report(self, report):
+        config = report['config']
+        environment = report['environment']
+        self.stdout.write(
+            f"{config['count']} resumes x {config['repeat']} runs, ~{config['words']} words, "
+            f"{'/'.join(config['formats'])}; model {environment['model']} "
+            f"({environment['backend']}, {environment['device']})"
+        )
+        self.stdout.write(f"{'stage':<12}{'unit':<8}{'p50 ms':>10}{'p95 ms':>10}{'resumes/s':>12}")
+        for stage, stats in report['stages'].items():
+            self.stdout.write(
+                f"{stage:<12}{stats['unit']:<8}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                f"{stats['resumes_per_s'] or 0:>12.1f}"
+            )
+        rss = report['peak_rss_bytes']
+        if rss:
+            self.stdout.write(
+                f"peak RSS: {rss['self'] / 2**20:.0f} MiB; {rss['parse_workers']} parse workers: "
+                f"{rss['parse_workers_total'] / 2**20:.0f} MiB total, {rss['parse_worker_max'] / 2**20:.0f} MiB max"
+            )
+
+        for stage, delta in report.get('comparison', {}).items():
+            line = (
+                f"{stage}: p95 {delta['baseline_p95_ms']:.2f} -> {delta['p95_ms']:.2f} ms "
+                f"({delta['change']:+.1%})"
+            )
+            self.stdout.write(self.style.ERROR(line) if delta['regression'] else line)
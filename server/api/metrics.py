@@ -0,0 +1,235 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# In-process metrics, exposed in the Prometheus text format by MetricsView.
+# Values are per process: with several workers, Prometheus scrapes each
+# one (or aggregates by instance) as usual.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._samples(items))
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def set_total(self, value, **labels):
+        """Mirror a total counted elsewhere (e.g. functools.lru_cache statistics)"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self, items):
+        if not items and not self.labelnames:
+            return [f"{self.name} 0"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    """Current value that can go up and down"""
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum"""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ((), 0.0))
+            return sum(counts)
+
+    def _samples(self, items):
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector):
+        """Call ``collector()`` before each render, to refresh values kept outside the registry"""
+        with self._lock:
+            self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for collector in collectors:
+            collector()
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'ats_stage_seconds', 'Time spent in each resume scoring stage.', ['stage'],
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'ats_cache_requests_total', 'Lookups of the JD artifact cache, the embedding store and the lemma cache.',
+    ['cache', 'result'],
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'ats_request_seconds', 'Time spent handling scoring API requests.', ['view'],
+))
+RESUMES_SCORED = REGISTRY.register(Counter(
+    'ats_resumes_scored_total', 'Resumes scored.',
+))
+PARSE_FAILURES = REGISTRY.register(Counter(
+    'ats_parse_failures_total', 'Uploaded files that yielded no text.',
+))
+ADMISSIONS = REGISTRY.register(Counter(
+    'ats_admissions_total', 'Scoring requests admitted or turned away by admission control.', ['result'],
+))
+ADMISSION_WAIT_SECONDS = REGISTRY.register(Histogram(
+    'ats_admission_wait_seconds', 'Time admitted scoring requests waited for capacity.',
+))
+INFLIGHT_RESUMES = REGISTRY.register(Gauge(
+    'ats_inflight_resumes', 'Resumes being scored under admission control.',
+))
+ENCODER_BATCH_TEXTS = REGISTRY.register(Histogram(
+    'ats_encoder_batch_texts', 'Texts per micro-batched encoder call.',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+))
+ENCODER_BATCH_CALLS = REGISTRY.register(Histogram(
+    'ats_encoder_batch_calls', 'Encode calls merged into each micro-batched encoder call.',
+    buckets=(1, 2, 4, 8, 16, 32),
+))
+
+# Seconds per stage of the current request, when it asked for a breakdown
+_request_stages = contextvars.ContextVar('ats_request_stages', default=None)
+
+
+@contextmanager
+def timer(stage):
+    """Time a block into ats_stage_seconds and the current request's breakdown"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages[stage] = stages.get(stage, 0.0) + elapsed
+
+
+def record_cache(cache, hits, misses):
+    if hits:
+        CACHE_REQUESTS.inc(hits, cache=cache, result='hit')
+    if misses:
+        CACHE_REQUESTS.inc(misses, cache=cache, result='miss')
+
+
+@contextmanager
+def request_stages():
+    """
+    Collect the stage timings of the enclosed block (in this thread or
+    context) into the yielded dict of {stage: seconds}.
+    """
+    stages = {}
+    token = _request_stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _request_stages.reset(token)
+
+
+def stage_breakdown(stages):
+    """Stage timings rounded to milliseconds, for a response body"""
+    return {stage: round(seconds * 1000, 2) for stage, seconds in stages.items()}
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_user_must_change_password'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumeEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('model_name', models.CharField(max_length=200)),
+                ('model_version', models.PositiveIntegerField()),
+                ('text', models.TextField()),
+                ('experience', models.TextField(blank=True)),
+                ('skills', models.JSONField(default=list)),
+                ('cleaned_experience', models.TextField(blank=True)),
+                ('cleaned_skills', models.TextField(blank=True)),
+                ('dimension', models.PositiveIntegerField()),
+                ('embedding', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('content_hash', 'model_name', 'model_version'), name='unique_resume_embedding')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:10
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import OperationalError, migrations, models
+
+
+def create_keyword_index(apps, schema_editor):
+    # SQLite only, and only when the library was built with FTS5; without
+    # the table keyword filtering falls back to substring matching
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS api_batchresume_fts USING fts5(batch, text)"
+        )
+    except OperationalError:
+        pass
+
+
+def drop_keyword_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS api_batchresume_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_scoring_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumeBatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('job_role', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resume_batches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BatchResume',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('result', models.JSONField(default=dict)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumes', to='api.resumebatch')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(create_keyword_index, drop_keyword_index),
+    ]
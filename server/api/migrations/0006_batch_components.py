@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_resume_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchresume',
+            name='components',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='batchresume',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='batchresume',
+            name='semantic_score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='resumebatch',
+            name='jd_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='resumebatch',
+            name='keyword_weight',
+            field=models.FloatField(default=0.5),
+        ),
+    ]
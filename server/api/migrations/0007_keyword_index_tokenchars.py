@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-17 05:02
+
+from django.db import OperationalError, migrations
+
+FTS_TABLE = 'api_batchresume_fts'
+
+
+def _rebuild_keyword_index(schema_editor, tokenize):
+    # The index holds the only copy of each resume's text, so rows are
+    # copied into the rebuilt table rather than dropped
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    if FTS_TABLE not in schema_editor.connection.introspection.table_names():
+        return
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE}_new USING fts5(batch, text, tokenize=\"{tokenize}\")"
+        )
+    except OperationalError:
+        return
+    schema_editor.execute(
+        f"INSERT INTO {FTS_TABLE}_new (rowid, batch, text) SELECT rowid, batch, text FROM {FTS_TABLE}"
+    )
+    schema_editor.execute(f"DROP TABLE {FTS_TABLE}")
+    schema_editor.execute(f"ALTER TABLE {FTS_TABLE}_new RENAME TO {FTS_TABLE}")
+
+
+def keep_symbol_tokens(apps, schema_editor):
+    # unicode61 splits on '+' and '#', which reduced c++ and c# to "c"
+    _rebuild_keyword_index(schema_editor, "unicode61 tokenchars '+#'")
+
+
+def drop_symbol_tokens(apps, schema_editor):
+    _rebuild_keyword_index(schema_editor, "unicode61")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_batch_components'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_symbol_tokens, drop_symbol_tokens),
+    ]
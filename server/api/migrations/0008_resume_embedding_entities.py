@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_keyword_index_tokenchars'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumeembedding',
+            name='entities',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
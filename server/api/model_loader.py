@@ -0,0 +1,221 @@
+import logging
+import os
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger('api')
+
+STATE_NOT_LOADED = 'not_loaded'
+STATE_LOADING = 'loading'
+STATE_READY = 'ready'
+STATE_FAILED = 'failed'
+
+# Global ATS instance to avoid reloading the model for each request.
+# Scoring goes through the stateless ATS API, so the instance is shared
+# by all request threads; the lock only guards its creation.
+_ats_instance = None
+_ats_lock = threading.Lock()
+
+# Optional small model for the first stage of two-stage ranking
+_screening_instance = None
+_screening_lock = threading.Lock()
+
+_state = STATE_NOT_LOADED
+_error = ''
+_load_seconds = None
+
+_torch_configured = False
+
+
+def configure_torch_threads():
+    """
+    Apply ATS_TORCH_THREADS (intra-op) and ATS_TORCH_INTEROP_THREADS to
+    this process, once, before the first model is built. None keeps
+    torch's default of one thread per core, which oversubscribes the CPU
+    when several server processes share a machine.
+    """
+    global _torch_configured
+    if _torch_configured:
+        return
+    _torch_configured = True
+    intra_op = getattr(settings, 'ATS_TORCH_THREADS', None)
+    inter_op = getattr(settings, 'ATS_TORCH_INTEROP_THREADS', None)
+    if not intra_op and not inter_op:
+        return
+    try:
+        import torch
+
+        if intra_op:
+            torch.set_num_threads(intra_op)
+        if inter_op:
+            # Only allowed before any inter-op parallel work has started
+            torch.set_num_interop_threads(inter_op)
+        logger.info(f"Torch threads: {torch.get_num_threads()} intra-op, {torch.get_num_interop_threads()} inter-op")
+    except (ImportError, RuntimeError) as e:
+        logger.warning(f"Could not configure torch threads: {str(e)}")
+
+
+def _create_ats(model_name, max_seq_length=None, embedding_dimension=None):
+    from .semantic_matcher import ATS
+
+    configure_torch_threads()
+    return ATS(
+        model_name=model_name,
+        max_seq_length=max_seq_length,
+        embedding_dimension=embedding_dimension,
+        enable_ner=getattr(settings, 'ATS_NER_ENABLED', False),
+        ner_model=getattr(settings, 'ATS_NER_MODEL', 'en_core_web_sm'),
+        backend=getattr(settings, 'ATS_ENCODER_BACKEND', 'torch'),
+        verify_backend=getattr(settings, 'ATS_ENCODER_VERIFY', True),
+        min_similarity=getattr(settings, 'ATS_ENCODER_MIN_SIMILARITY', 0.99),
+        onnx_dir=getattr(settings, 'ATS_ONNX_DIR', None),
+        chunk_long_texts=getattr(settings, 'ATS_CHUNK_LONG_TEXTS', False),
+        chunk_pooling=getattr(settings, 'ATS_CHUNK_POOLING', 'mean'),
+        chunk_overlap=getattr(settings, 'ATS_CHUNK_OVERLAP', 64),
+        max_chunks=getattr(settings, 'ATS_MAX_CHUNKS', 8),
+        micro_batching=getattr(settings, 'ATS_ENCODER_MICROBATCH', True),
+        micro_batch_wait_ms=getattr(settings, 'ATS_ENCODER_MICROBATCH_WAIT_MS', 5),
+        micro_batch_size=getattr(settings, 'ATS_ENCODER_MICROBATCH_SIZE', 64),
+        micro_batch_timeout=getattr(settings, 'ATS_ENCODER_MICROBATCH_TIMEOUT', 120),
+    )
+
+
+def get_ats_instance():
+    """Get or create a singleton ATS instance to avoid reloading the model"""
+    global _ats_instance, _state, _error, _load_seconds
+    if _ats_instance is None:
+        with _ats_lock:
+            if _ats_instance is None:
+                logger.info("Initializing ATS instance...")
+                _state = STATE_LOADING
+                started = time.monotonic()
+                try:
+                    ats = _create_ats(
+                        getattr(settings, 'ATS_MODEL_NAME', None),
+                        getattr(settings, 'ATS_MAX_SEQ_LENGTH', None),
+                        getattr(settings, 'ATS_EMBEDDING_DIMENSION', None),
+                    )
+                except Exception as e:
+                    _state, _error = STATE_FAILED, str(e)
+                    raise
+                _load_seconds = round(time.monotonic() - started, 3)
+                _ats_instance = ats
+                _state, _error = STATE_READY, ''
+                logger.info(f"ATS instance initialized successfully in {_load_seconds}s")
+    return _ats_instance
+
+
+def is_two_stage_enabled():
+    return bool(getattr(settings, 'ATS_SCREENING_MODEL_NAME', None))
+
+
+def get_screening_instance():
+    """
+    The ATS instance of the small screening model used by two-stage
+    ranking, or None when ATS_SCREENING_MODEL_NAME is not set
+    """
+    global _screening_instance
+    if not is_two_stage_enabled():
+        return None
+    if _screening_instance is None:
+        with _screening_lock:
+            if _screening_instance is None:
+                logger.info("Initializing screening ATS instance...")
+                _screening_instance = _create_ats(
+                    settings.ATS_SCREENING_MODEL_NAME,
+                    getattr(settings, 'ATS_SCREENING_MAX_SEQ_LENGTH', None),
+                    getattr(settings, 'ATS_SCREENING_EMBEDDING_DIMENSION', None),
+                )
+    return _screening_instance
+
+
+def is_model_ready():
+    return _state == STATE_READY
+
+
+def model_status():
+    """Snapshot of the model lifecycle for the readiness endpoint"""
+    status = {'state': _state}
+    if _ats_instance is not None:
+        status['model'] = _ats_instance.model_name
+        status['device'] = _ats_instance.device
+        status['backend'] = _ats_instance.backend
+        status['backend_check'] = _ats_instance.backend_report
+        status['dimension'] = _ats_instance.embedding_dimension
+        status['max_seq_length'] = _ats_instance.max_seq_length
+        status['truncation'] = dict(_ats_instance.truncation_stats)
+    if _screening_instance is not None:
+        status['screening_model'] = _screening_instance.model_name
+        status['screening_dimension'] = _screening_instance.embedding_dimension
+    if _load_seconds is not None:
+        status['load_seconds'] = _load_seconds
+    if _error:
+        status['error'] = _error
+    return status
+
+
+def warm_up():
+    """Load the model(s) and NLTK data and run one encode so the first request is fast"""
+    try:
+        from .semantic_matcher import get_text_cleaner
+
+        cleaner = get_text_cleaner()
+        if not cleaner.complete:
+            logger.error(
+                "NLTK data unavailable: text is cleaned without lemmatization, "
+                "and scores differ from a fully initialised cleaner until it is installed"
+            )
+        text = cleaner.clean_text("warm up the encoder")
+        get_ats_instance().encode([text])
+        if is_two_stage_enabled():
+            get_screening_instance().encode([text])
+        logger.info("ATS model warm-up complete")
+    except Exception as e:
+        logger.error(f"ATS model warm-up failed: {str(e)}")
+
+
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+
+
+def start_warmup():
+    """Warm the model in a background thread, unless a warm-up is already running"""
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None or not _warmup_thread.is_alive():
+            _warmup_thread = threading.Thread(target=warm_up, name="ats-warmup", daemon=True)
+            _warmup_thread.start()
+        return _warmup_thread
+
+
+def ensure_warmup():
+    """Start warming the model if nothing has loaded it yet (readiness probe)"""
+    if _state == STATE_NOT_LOADED:
+        start_warmup()
+
+
+# Set to 1 by server/wsgi.py and server/asgi.py; other entry points that
+# serve requests can set it too
+SERVING_ENV = 'ATS_SERVING'
+
+
+def is_serving_process():
+    """
+    True when this process is known to serve requests: one started through
+    the WSGI/ASGI entry points (ATS_SERVING=1), or the reloaded child of
+    ``runserver``. Anything else (management commands, test runners,
+    scripts calling django.setup()) returns False.
+    """
+    if os.environ.get(SERVING_ENV) == '1':
+        return True
+    argv = sys.argv
+    if len(argv) >= 2 and argv[1] == 'runserver':
+        return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in argv
+    return False
+
+
+def should_warm_up():
+    return getattr(settings, 'ATS_WARMUP_ON_STARTUP', True) and is_serving_process()
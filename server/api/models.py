@@ -1,3 +1,6 @@
+import uuid
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
@@ -6,4 +9,113 @@ class User(AbstractUser):
     must_change_password = models.BooleanField(default=True)
 
     USERNAME_FIELD = 'email'
-    REQUIRED_FIELDS = ['username']
\ No newline at end of file
+    REQUIRED_FIELDS = ['username']
+
+class ResumeEmbedding(models.Model):
+    """
+    Parsed text, cleaned sections and embedding of a resume file, keyed by
+    the SHA-256 of the uploaded bytes and the encoder that produced it.
+    """
+    content_hash = models.CharField(max_length=64)
+    model_name = models.CharField(max_length=200)
+    model_version = models.PositiveIntegerField()
+    text = models.TextField()
+    experience = models.TextField(blank=True)
+    skills = models.JSONField(default=list)
+    cleaned_experience = models.TextField(blank=True)
+    cleaned_skills = models.TextField(blank=True)
+    entities = models.JSONField(null=True, blank=True)  # NER stage output, when it ran
+    dimension = models.PositiveIntegerField()
+    embedding = models.BinaryField()  # float32, little-endian
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_hash', 'model_name', 'model_version'],
+                name='unique_resume_embedding',
+            ),
+        ]
+
+
+class ScoringJob(models.Model):
+    """
+    A resume batch queued for background scoring. Workers claim queued jobs
+    straight from this table, so no external broker is needed.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='scoring_jobs')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    job_role = models.CharField(max_length=100)
+    keyword_weight = models.FloatField(default=0.5)
+    jd_text = models.TextField()
+    total_files = models.PositiveIntegerField(default=0)
+    processed_files = models.PositiveIntegerField(default=0)
+    results = models.JSONField(default=list)  # ranked, grows as chunks finish
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # worker heartbeat
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+
+class ScoringJobFile(models.Model):
+    """An uploaded resume waiting to be scored by its job"""
+    job = models.ForeignKey(ScoringJob, on_delete=models.CASCADE, related_name='files')
+    position = models.PositiveIntegerField()
+    name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    content = models.BinaryField()
+
+    class Meta:
+        ordering = ['position']
+
+
+class ResumeBatch(models.Model):
+    """
+    One set of resumes scored together (a processing request or a
+    background job, which shares its id), kept so the batch can be
+    searched and re-ranked server-side without the client sending
+    results back or re-uploading files
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='resume_batches')
+    job_role = models.CharField(max_length=100)
+    keyword_weight = models.FloatField(default=0.5)
+    jd_hash = models.CharField(max_length=64, blank=True)  # SHA-256 of the job description text
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+
+class BatchResume(models.Model):
+    """
+    A scored resume of a batch. Its full text lives in the keyword index
+    (SQLite FTS5) under the same rowid, and in the embedding store under
+    ``content_hash``. The raw job_matcher component scores and the semantic
+    score are kept so the batch can be re-weighted without re-scoring.
+    """
+    batch = models.ForeignKey(ResumeBatch, on_delete=models.CASCADE, related_name='resumes')
+    name = models.CharField(max_length=255)
+    content_hash = models.CharField(max_length=64, blank=True)  # SHA-256 of the uploaded file
+    components = models.JSONField(default=list)  # in job_matcher.COMPONENTS order
+    semantic_score = models.FloatField(default=0.0)
+    result = models.JSONField(default=dict)  # as returned by the processing endpoint
+
+    class Meta:
+        ordering = ['id']
@@ -1,13 +1,23 @@
+import functools
+import threading
 import nltk
 import logging
 
+from . import metrics
+
 logger = logging.getLogger(__name__)
 
+_nltk_data_checked = False
+
 def ensure_nltk_data():
     """
     Ensure required NLTK data is downloaded.
-    This function should be called once during application startup.
+    Runs once per process (on first use, or during startup warm-up);
+    later calls return immediately.
     """
+    global _nltk_data_checked
+    if _nltk_data_checked:
+        return
     required_data = [
         ('tokenizers/punkt', 'punkt'),
         ('corpora/stopwords', 'stopwords'),
@@ -21,4 +31,43 @@ def ensure_nltk_data():
         except LookupError:
             logger.info(f"Downloading NLTK data: {download_name}")
             nltk.download(download_name, quiet=True)
-            logger.info(f"Successfully downloaded NLTK data: {download_name}")
\ No newline at end of file
+            logger.info(f"Successfully downloaded NLTK data: {download_name}")
+    _nltk_data_checked = True
+
+# Upper bound on distinct tokens kept in the shared lemma cache
+LEMMA_CACHE_SIZE = 50000
+
+_lemmatizer = None
+_lemmatizer_lock = threading.Lock()
+
+def get_lemmatizer():
+    """
+    Return the process-wide WordNetLemmatizer.
+    WordNet is loaded lazily by NLTK, so the first lemmatization is done
+    under a lock to keep concurrent threads from racing on the corpus load.
+    """
+    global _lemmatizer
+    if _lemmatizer is None:
+        with _lemmatizer_lock:
+            if _lemmatizer is None:
+                from nltk.stem import WordNetLemmatizer
+                lemmatizer = WordNetLemmatizer()
+                lemmatizer.lemmatize("test")
+                _lemmatizer = lemmatizer
+    return _lemmatizer
+
+@functools.lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize(token):
+    """Lemmatize a single token, memoized in a bounded LRU cache."""
+    return get_lemmatizer().lemmatize(token)
+
+def lemma_cache_info():
+    """Hit/miss counters and current size of the shared lemma cache."""
+    return lemmatize.cache_info()
+
+@metrics.REGISTRY.add_collector
+def _collect_lemma_cache():
+    """Publish the lemma cache counters as ats_cache_requests_total{cache="lemma"}."""
+    info = lemma_cache_info()
+    metrics.CACHE_REQUESTS.set_total(info.hits, cache='lemma', result='hit')
+    metrics.CACHE_REQUESTS.set_total(info.misses, cache='lemma', result='miss')
@@ -0,0 +1,135 @@
+import base64
+import binascii
+import heapq
+import json
+from dataclasses import dataclass
+
+from django.conf import settings
+
+DEFAULT_MAX_PAGE_SIZE = 500
+
+# Request parameters understood by parse_page_params
+PAGE_PARAMS = ('top_k', 'limit', 'cursor', 'fields', 'exclude')
+
+# Identifies a result whatever fields are selected
+ALWAYS_INCLUDED_FIELDS = ('resume',)
+
+
+@dataclass(frozen=True)
+class PageRequest:
+    """
+    top_k: only the best ``top_k`` results are ranked and returned at all
+    limit: page size (None returns every remaining result)
+    cursor: opaque position returned as next_cursor by the previous page
+    fields / exclude: result keys to keep / drop
+    """
+    top_k: int = None
+    limit: int = None
+    cursor: tuple = None
+    fields: tuple = None
+    exclude: tuple = ()
+
+    @property
+    def paginated(self):
+        return self.limit is not None or self.cursor is not None
+
+
+def _positive_int(name, value):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a positive integer")
+    if number < 1:
+        raise ValueError(f"{name} must be a positive integer")
+    return number
+
+
+def _field_list(value):
+    return tuple(field.strip() for field in str(value).split(',') if field.strip())
+
+
+def encode_cursor(score, seq, rank):
+    """Opaque cursor after the result with ``score`` and storage position ``seq``, at ``rank``"""
+    payload = json.dumps([score, seq, rank], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        score, seq, rank = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return float(score), int(seq), int(rank)
+    except (binascii.Error, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_page_params(params):
+    """Build a PageRequest from request parameters; raises ValueError on bad values"""
+    max_page_size = getattr(settings, 'ATS_MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)
+    top_k = params.get('top_k')
+    limit = params.get('limit')
+    cursor = params.get('cursor')
+    fields = params.get('fields')
+    return PageRequest(
+        top_k=_positive_int('top_k', top_k) if top_k not in (None, '') else None,
+        limit=min(_positive_int('limit', limit), max_page_size) if limit not in (None, '') else None,
+        cursor=decode_cursor(cursor) if cursor else None,
+        fields=_field_list(fields) if fields else None,
+        exclude=_field_list(params.get('exclude') or ''),
+    )
+
+
+def select_fields(result, page):
+    """Copy of ``result`` with only the requested fields"""
+    if page.fields is None and not page.exclude:
+        return result
+    return {
+        key: value for key, value in result.items()
+        if (page.fields is None or key in page.fields or key in ALWAYS_INCLUDED_FIELDS)
+        and key not in page.exclude
+    }
+
+
+def rank_page(entries, page):
+    """
+    Select one page of (score, seq, item) entries, ranked by score (best
+    first) with ties in ``seq`` order, the order a stable sort of results
+    in storage order gives. Only the entries past the cursor are kept and
+    at most the page (plus one, to detect a next page) is selected, with a
+    heap, so a small page of a large batch costs O(n log page) rather than
+    a full sort.
+
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    rank = 0
+    if page.cursor is not None:
+        after_score, after_seq, rank = page.cursor
+        entries = (
+            entry for entry in entries
+            if entry[0] < after_score or (entry[0] == after_score and entry[1] > after_seq)
+        )
+    remaining = page.top_k - rank if page.top_k is not None else None
+    if remaining is not None and remaining <= 0:
+        return [], None
+
+    size = min(filter(None, (page.limit, remaining)), default=None)
+    key = lambda entry: (-entry[0], entry[1])
+    if size is None:
+        return [item for _, _, item in sorted(entries, key=key)], None
+
+    # One extra entry tells whether another page follows
+    selected = heapq.nsmallest(size + 1 if size != remaining else size, entries, key=key)
+    has_more = len(selected) > size
+    selected = selected[:size]
+    next_cursor = None
+    if has_more and selected:
+        score, seq, _ = selected[-1]
+        next_cursor = encode_cursor(score, seq, rank + len(selected))
+    return [item for _, _, item in selected], next_cursor
+
+
+def page_results(results, page):
+    """One page of in-memory results (in storage order); returns (results, next_cursor)"""
+    items, next_cursor = rank_page(
+        ((result.get('score', 0), seq, result) for seq, result in enumerate(results)), page
+    )
+    return [select_fields(result, page) for result in items], next_cursor
@@ -0,0 +1,144 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger('api')
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'profiles')
+DEFAULT_MAX_PROFILES = 100
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+_PROFILE_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def get_profile_dir():
+    return str(getattr(settings, 'ATS_PROFILE_DIR', None) or DEFAULT_PROFILE_DIR)
+
+
+def _truthy(value):
+    return str(value or '').lower() in ('1', 'true', 'yes')
+
+
+def profile_path(profile_id, extension='prof'):
+    """Path of a stored profile (or its .json metadata); None for malformed ids"""
+    if not _PROFILE_ID.match(str(profile_id)):
+        return None
+    return os.path.join(get_profile_dir(), f"{profile_id}.{extension}")
+
+
+def save_profile(profiler, metadata):
+    """Write a profile and its metadata; returns the new profile id"""
+    profile_id = uuid.uuid4().hex
+    os.makedirs(get_profile_dir(), exist_ok=True)
+    profiler.dump_stats(profile_path(profile_id))
+    with open(profile_path(profile_id, 'json'), 'w', encoding='utf-8') as metadata_file:
+        json.dump({'id': profile_id, **metadata}, metadata_file)
+    _prune_profiles()
+    return profile_id
+
+
+def list_profiles():
+    """Metadata of the stored profiles, newest first"""
+    profiles = []
+    directory = get_profile_dir()
+    if not os.path.isdir(directory):
+        return profiles
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as metadata_file:
+                profiles.append(json.load(metadata_file))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda profile: profile.get('created_at', ''), reverse=True)
+
+
+def profile_summary(profile_id, limit=40):
+    """pstats report of a stored profile, by cumulative time"""
+    output = io.StringIO()
+    stats = pstats.Stats(profile_path(profile_id), stream=output)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
+
+
+def _prune_profiles():
+    """Keep the newest ATS_PROFILE_MAX_FILES profiles"""
+    keep = getattr(settings, 'ATS_PROFILE_MAX_FILES', DEFAULT_MAX_PROFILES)
+    for profile in list_profiles()[keep:]:
+        for extension in ('prof', 'json'):
+            try:
+                os.remove(profile_path(profile['id'], extension))
+            except OSError:
+                pass
+
+
+class ProfilingMixin:
+    """
+    Request-scoped cProfile for APIViews. A staff user asks for a profile
+    with the X-Profile: 1 header or ?profile=true; besides, a random
+    ATS_PROFILE_SAMPLE_RATE fraction of all requests is profiled. The
+    profile is saved under ATS_PROFILE_DIR, its id returned to staff in
+    the X-Profile-Id header, and it can be downloaded from ProfileView.
+
+    Profiling starts once DRF has authenticated the request and stops when
+    the response is finalized, so it covers the handler in this thread
+    only: work in the parse process pool or streamed after the view has
+    returned is not included.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._profiler = None
+        self._profile_reason = None
+        user = request.user
+        if getattr(user, 'is_staff', False) and (
+            _truthy(request.headers.get(PROFILE_HEADER)) or _truthy(request.query_params.get('profile'))
+        ):
+            self._profile_reason = 'requested'
+        elif random.random() < getattr(settings, 'ATS_PROFILE_SAMPLE_RATE', 0.0):
+            self._profile_reason = 'sampled'
+        if self._profile_reason:
+            self._profile_started = time.perf_counter()
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError as e:
+                # Another profiler is already active in this thread
+                logger.warning(f"Request profiling skipped: {str(e)}")
+                self._profiler = None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        profiler = getattr(self, '_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            self._profiler = None
+            try:
+                profile_id = save_profile(profiler, {
+                    'view': type(self).__name__,
+                    'method': request.method,
+                    'path': request.path,
+                    'user': getattr(request.user, 'email', ''),
+                    'reason': self._profile_reason,
+                    'status': response.status_code,
+                    'duration_s': round(time.perf_counter() - self._profile_started, 4),
+                    'created_at': timezone.now().isoformat(),
+                })
+                logger.info(f"Saved {self._profile_reason} profile {profile_id} of {request.path}")
+                if getattr(request.user, 'is_staff', False):
+                    response[PROFILE_ID_HEADER] = profile_id
+            except Exception as e:
+                logger.error(f"Profile write error: {str(e)}")
+        return super().finalize_response(request, response, *args, **kwargs)
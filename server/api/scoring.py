@@ -0,0 +1,448 @@
+import heapq
+import itertools
+import logging
+import queue
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+from django.conf import settings
+
+from . import batch_store, embedding_store, metrics
+from .embedding_store import file_digest
+from .file_parsing import parse_uploads
+from .jd_cache import get_jd_artifacts
+from .job_matcher import compute_final_scores
+from .model_loader import get_ats_instance, get_screening_instance
+from .semantic_matcher import DEFAULT_BATCH_SIZE, ResumeEntities
+
+logger = logging.getLogger('api')
+
+DEFAULT_RERANK_TOP_K = 50
+
+def rank_results(results):
+    """Sort scored resumes by final score, best first"""
+    return sorted(results, key=lambda x: x['score'], reverse=True)
+
+
+@dataclass
+class _RerankCandidate:
+    """A screened resume kept for the second ranking stage"""
+    result: dict
+    digest: str
+    text: str
+    keyword_score: float
+    entities: object
+    row_id: int = None  # BatchResume holding the result, when indexed
+    semantic_score: float = 0.0
+
+
+class ResumeScorer:
+    """
+    Scores uploaded resumes against one job description, combining the
+    keyword (job_matcher) and semantic (ATS) scores. Shared by the
+    synchronous endpoint and the background job workers.
+
+    With two-stage ranking (ATS_SCREENING_MODEL_NAME) every resume is first
+    scored with the small screening model; rerank() then re-scores the
+    best ATS_RERANK_TOP_K of them with the main model.
+
+    Given a ResumeBatch, every scored resume is also stored in it with its
+    component scores and its full text in the keyword index, for
+    server-side filtering and re-ranking.
+    """
+
+    def __init__(self, jd_text, job_role, keyword_weight=0.5, batch=None):
+        self.jd_text = jd_text
+        self.job_role = job_role
+        self.keyword_weight = keyword_weight
+        self.batch = batch
+        self.screening = self._get_screening_model()
+        self.rerank_top_k = getattr(settings, 'ATS_RERANK_TOP_K', DEFAULT_RERANK_TOP_K)
+        # Min-heap of the best screened resumes seen so far
+        self._candidates = []
+        self._sequence = itertools.count()
+        # Cleaned text, embedding and TF-IDF terms of the JD, computed once
+        self.jd_artifacts = self._get_jd_artifacts()
+
+    def score_files(self, resume_files, rerank=True):
+        """
+        Score a list of uploaded resume files. Returns one result dict per
+        successfully parsed file, in upload order. Callers scoring one set
+        in several calls pass ``rerank=False`` and call rerank() at the end.
+        """
+        # Resumes already in the embedding store skip parsing and encoding
+        digests = [file_digest(resume_file) for resume_file in resume_files]
+        stored = self._lookup_stored_resumes(digests)
+
+        # Parse all new resumes in parallel
+        texts = [stored[digest].text if digest in stored else None for digest in digests]
+        to_parse = [index for index, text in enumerate(texts) if text is None]
+        with metrics.timer('parse'):
+            for position, resume_text in self._parse_files([resume_files[index] for index in to_parse]):
+                texts[to_parse[position]] = resume_text
+
+        parsed = []
+        for resume_file, resume_text, digest in zip(resume_files, texts, digests):
+            if not resume_text:
+                logger.warning(f"Failed to parse resume: {resume_file.name}")
+                metrics.PARSE_FAILURES.inc()
+                continue
+            parsed.append((resume_file.name, resume_text, digest))
+
+        results = self.score_texts(parsed, stored)
+        if rerank:
+            self.rerank()
+        return results
+
+    def iter_scores(self, resume_files, max_batch_size=None):
+        """
+        Score uploaded resume files incrementally, yielding lists of result
+        dicts as soon as they are scored. Resumes already in the embedding
+        store come first; the rest are parsed in a background thread and
+        every scoring pass takes whatever has been parsed since the last
+        one (up to ``max_batch_size``), so the first results arrive quickly
+        and later batches grow while parsing is ahead of scoring. With
+        two-stage ranking these are screening scores; call rerank() after.
+        """
+        if max_batch_size is None:
+            max_batch_size = getattr(settings, 'ATS_ENCODE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+        digests = [file_digest(resume_file) for resume_file in resume_files]
+        stored = self._lookup_stored_resumes(digests)
+
+        known = [
+            (resume_file.name, stored[digest].text, digest)
+            for resume_file, digest in zip(resume_files, digests) if digest in stored
+        ]
+        for start in range(0, len(known), max_batch_size):
+            yield self.score_texts(known[start:start + max_batch_size], stored)
+
+        to_parse = [index for index, digest in enumerate(digests) if digest not in stored]
+        if not to_parse:
+            return
+
+        parsed_queue = queue.Queue()
+        done = object()
+
+        def parse_all():
+            try:
+                with metrics.timer('parse'):
+                    for position, resume_text in self._parse_files([resume_files[index] for index in to_parse]):
+                        parsed_queue.put((to_parse[position], resume_text))
+            except Exception as e:
+                logger.error(f"Resume parsing error: {str(e)}")
+            finally:
+                parsed_queue.put(done)
+
+        threading.Thread(target=parse_all, name="ats-stream-parser", daemon=True).start()
+
+        finished = False
+        while not finished:
+            items = [parsed_queue.get()]
+            while len(items) < max_batch_size:
+                try:
+                    items.append(parsed_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if done in items:
+                finished = True
+                items.remove(done)
+
+            batch = []
+            for index, resume_text in items:
+                if not resume_text:
+                    logger.warning(f"Failed to parse resume: {resume_files[index].name}")
+                    metrics.PARSE_FAILURES.inc()
+                    continue
+                batch.append((resume_files[index].name, resume_text, digests[index]))
+            if batch:
+                yield self.score_texts(batch, stored)
+
+    def score_texts(self, resumes, stored=None):
+        """Score already parsed (name, text, digest) resumes"""
+        resume_texts = [resume_text for _, resume_text, _ in resumes]
+        # Structured fields from the opt-in NER stage (None when disabled)
+        entities = self._extract_entities(resumes, stored)
+
+        # Keyword and semantic scores for the whole batch, each in one batched pass
+        with metrics.timer('keyword'):
+            keyword_scores, components = self._calculate_keyword_scores(resume_texts, entities)
+        with metrics.timer('semantic'):
+            semantic_scores = self._calculate_semantic_scores(
+                [(digest, resume_text) for _, resume_text, digest in resumes], stored, entities
+            )
+
+        results = []
+        weighted_scores = []
+        for index, ((name, resume_text, _), keyword_score, semantic_score) in enumerate(zip(
+            resumes, keyword_scores, semantic_scores
+        )):
+            # Calculate final weighted score
+            weighted_score = (keyword_score * self.keyword_weight) + (semantic_score * (1 - self.keyword_weight))
+            final_score = round(weighted_score)
+            weighted_scores.append(weighted_score)
+
+            results.append({
+                'resume': name,
+                'score': final_score,
+                'keywordScore': round(keyword_score),
+                'semanticScore': round(semantic_score),
+                'text': resume_text[:500]  # First 500 chars for keyword search
+            })
+            if entities is not None:
+                results[-1]['entities'] = entities[index].as_dict()
+            if self.screening is not None:
+                results[-1]['reranked'] = False
+
+            logger.info(f"Processed resume: {name} - Score: {final_score}")
+
+        metrics.RESUMES_SCORED.inc(len(results))
+        with metrics.timer('batch_store'):
+            row_ids = self._index_results(resumes, results, components, semantic_scores)
+        if self.screening is not None:
+            for index, ((_, resume_text, digest), result) in enumerate(zip(resumes, results)):
+                self._add_candidate(weighted_scores[index], _RerankCandidate(
+                    result=result,
+                    digest=digest,
+                    text=resume_text,
+                    keyword_score=keyword_scores[index],
+                    entities=entities[index] if entities is not None else None,
+                    row_id=row_ids[index] if row_ids else None,
+                ))
+        return results
+
+    def rerank(self):
+        """
+        Second stage of two-stage ranking: re-score the best screened
+        resumes with the main model, updating their result dicts in place.
+        Returns the updated results; empty when two-stage ranking is off.
+        """
+        candidates = [candidate for _, _, candidate in self._candidates]
+        self._candidates = []
+        if not candidates:
+            return []
+        with metrics.timer('rerank'):
+            try:
+                ats = get_ats_instance()
+                entities = [candidate.entities for candidate in candidates]
+                semantic_scores = self._semantic_scores(
+                    [(candidate.digest, candidate.text) for candidate in candidates],
+                    self._lookup_stored_resumes([candidate.digest for candidate in candidates], ats),
+                    entities if all(entity is not None for entity in entities) else None,
+                    ats,
+                    get_jd_artifacts(self.jd_text, ats),
+                )
+            except Exception as e:
+                # The screening scores stand
+                logger.error(f"Re-ranking error: {str(e)}")
+                return []
+
+            for candidate, semantic_score in zip(candidates, semantic_scores):
+                result = candidate.result
+                result['score'] = round(
+                    (candidate.keyword_score * self.keyword_weight) + (semantic_score * (1 - self.keyword_weight))
+                )
+                result['semanticScore'] = round(semantic_score)
+                result['reranked'] = True
+                candidate.semantic_score = semantic_score
+            logger.info(f"Re-ranked top {len(candidates)} resumes with {ats.model_name}")
+            self._update_indexed_results(candidates)
+        return [candidate.result for candidate in candidates]
+
+    def _add_candidate(self, screening_score, candidate):
+        """Keep a screened resume if it is among the best rerank_top_k so far"""
+        entry = (screening_score, next(self._sequence), candidate)
+        if len(self._candidates) < self.rerank_top_k:
+            heapq.heappush(self._candidates, entry)
+        elif self.rerank_top_k > 0:
+            heapq.heappushpop(self._candidates, entry)
+
+    def _index_results(self, resumes, results, components, semantic_scores):
+        """Store results, component scores and full texts in the batch; returns their row ids"""
+        if self.batch is None or not results:
+            return None
+        try:
+            return batch_store.add_resumes(self.batch, [
+                (
+                    name, resume_text, digest,
+                    components[index] if components is not None else None,
+                    semantic_scores[index], results[index],
+                )
+                for index, (name, resume_text, digest) in enumerate(resumes)
+            ])
+        except Exception as e:
+            logger.error(f"Batch store error: {str(e)}")
+            return None
+
+    def _update_indexed_results(self, candidates):
+        updates = [
+            (candidate.row_id, candidate.result, candidate.semantic_score)
+            for candidate in candidates if candidate.row_id
+        ]
+        if not updates:
+            return
+        try:
+            batch_store.update_results(updates)
+        except Exception as e:
+            logger.error(f"Batch store error: {str(e)}")
+
+    def _parse_files(self, files):
+        """
+        Parse uploaded files in the parse process pool, yielding
+        (index, text) pairs as each one finishes
+        """
+        return parse_uploads(enumerate(files))
+
+    def _get_screening_model(self):
+        """The screening ATS for two-stage ranking; None when disabled or unavailable"""
+        try:
+            return get_screening_instance()
+        except Exception as e:
+            logger.error(f"Screening model error, ranking in one stage: {str(e)}")
+            return None
+
+    def _first_stage(self):
+        """The ATS instance every resume is encoded with"""
+        return self.screening or get_ats_instance()
+
+    def _get_jd_artifacts(self):
+        """Fetch the cached job description artifacts, or None if unavailable"""
+        try:
+            with metrics.timer('jd_artifacts'):
+                return get_jd_artifacts(self.jd_text, self._first_stage())
+        except Exception as e:
+            logger.error(f"Job description preprocessing error: {str(e)}")
+            return None
+
+    def _extract_entities(self, resumes, stored=None):
+        """
+        Run the NER stage over (name, text, digest) resumes when enabled;
+        None otherwise or on failure. Resumes from the embedding store reuse
+        the entities saved with them.
+        """
+        stored = stored or {}
+        try:
+            ats = get_ats_instance()
+            if not ats.enable_ner:
+                return None
+            entities = [
+                ResumeEntities(**stored[digest].entities)
+                if digest in stored and stored[digest].entities is not None else None
+                for _, _, digest in resumes
+            ]
+            missing = [index for index, entity in enumerate(entities) if entity is None]
+            if missing:
+                found = ats.extract_entities([resumes[index][1] for index in missing])
+                if found is None:
+                    return None
+                for index, entity in zip(missing, found):
+                    entities[index] = entity
+            return entities
+        except Exception as e:
+            logger.error(f"NER extraction error: {str(e)}")
+            return None
+
+    def _calculate_keyword_scores(self, resume_texts, entities=None):
+        """
+        Calculate keyword-based scores for a batch of resumes using
+        job_matcher. Returns (scores, components), the latter being the raw
+        component matrix or None on failure.
+        """
+        try:
+            jd_terms = self.jd_artifacts.term_counts if self.jd_artifacts else None
+            experience_years = [e.experience_years for e in entities] if entities is not None else None
+            scores, components = compute_final_scores(
+                resume_texts, self.jd_text, self.job_role, jd_terms, experience_years, return_components=True
+            )
+            return [float(score) for score in scores], components
+        except Exception as e:
+            logger.error(f"Keyword scoring error: {str(e)}")
+            return [0] * len(resume_texts), None
+
+    def _lookup_stored_resumes(self, digests, ats=None):
+        """Load previously embedded resumes for the first-stage (or given) model"""
+        try:
+            ats = ats or self._first_stage()
+            with metrics.timer('embedding_store_lookup'):
+                stored = embedding_store.lookup(
+                    digests, ats.store_key, ats.EMBEDDING_VERSION, ats.embedding_dimension
+                )
+            metrics.record_cache('embedding_store', len(stored), len(set(digests)) - len(stored))
+            return stored
+        except Exception as e:
+            logger.error(f"Embedding store lookup error: {str(e)}")
+            return {}
+
+    def _calculate_semantic_scores(self, resumes, stored=None, entities=None):
+        """
+        Calculate first-stage semantic similarity scores for a batch of
+        (digest, text) resumes; zeros if scoring fails.
+        """
+        if not resumes:
+            return []
+        try:
+            return self._semantic_scores(resumes, stored, entities, self._first_stage(), self.jd_artifacts)
+        except Exception as e:
+            logger.error(f"Semantic scoring error: {str(e)}")
+            return [0] * len(resumes)
+
+    def _semantic_scores(self, resumes, stored, entities, ats, jd_artifacts):
+        """
+        Semantic similarity of (digest, text) resumes under ``ats``. Resumes
+        missing from the embedding store go through ATS.score_batch and are
+        saved; stored ones are scored from their saved embeddings by
+        ATS.compute_similarity_batch, so they cost one dot product each.
+        """
+        stored = stored or {}
+        batch_size = getattr(settings, 'ATS_ENCODE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+        # Encode each new file once, even if it was uploaded twice
+        new_texts = {}
+        new_entities = {}
+        for index, (digest, resume_text) in enumerate(resumes):
+            if digest not in stored and digest not in new_texts:
+                new_texts[digest] = resume_text
+                new_entities[digest] = entities[index] if entities is not None else None
+
+        scores = {}
+        if new_texts:
+            with metrics.timer('encode'):
+                similarities = ats.score_batch(
+                    list(new_texts.values()), self.jd_text, batch_size=batch_size, jd_artifacts=jd_artifacts,
+                    entities=list(new_entities.values()) if entities is not None else None
+                )
+            with metrics.timer('embedding_store_write'):
+                for (digest, resume_text), similarity in zip(new_texts.items(), similarities):
+                    scores[digest] = similarity.score
+                    self._store_resume_embedding(ats, digest, resume_text, similarity.resume, similarity.embedding)
+
+        known = [digest for digest in dict.fromkeys(digest for digest, _ in resumes) if digest not in scores]
+        if known:
+            if jd_artifacts is not None:
+                cleaned_jd_text, jd_embedding = jd_artifacts.cleaned_text, jd_artifacts.embedding
+            else:
+                cleaned_jd_text, jd_embedding = ats.clean_jd(self.jd_text), None
+            known_scores = ats.compute_similarity_batch(
+                [stored[digest].cleaned_experience + " " + stored[digest].cleaned_skills for digest in known],
+                cleaned_jd_text,
+                jd_embedding=jd_embedding,
+                resume_embeddings=np.vstack([stored[digest].embedding for digest in known]),
+            )
+            scores.update(zip(known, known_scores))
+
+        similarity_scores = [float(scores[digest]) * 100 for digest, _ in resumes]
+        logger.debug(
+            f"Semantic similarity scores calculated for {len(similarity_scores)} resumes "
+            f"with {ats.model_name} ({len(new_texts)} newly encoded)"
+        )
+        return similarity_scores
+
+    def _store_resume_embedding(self, ats, digest, resume_text, prepared, embedding):
+        """Persist a newly encoded resume; failures only cost a future re-encode"""
+        try:
+            embedding_store.save(
+                digest, ats.store_key, ats.EMBEDDING_VERSION, resume_text, prepared, embedding
+            )
+        except Exception as e:
+            logger.error(f"Embedding store write error: {str(e)}")
@@ -0,0 +1,92 @@
+import re
+from functools import cached_property
+
+SECTION_HEADERS = [
+    "Contact Information", "Objective", "Summary", "Education", "Experience",
+    "Skills", "Projects", "Certifications", "Licenses", "Awards", "Honors",
+    "Publications", "References", "Technical Skills", "Computer Skills",
+    "Programming Languages", "Software Skills", "Soft Skills", "Language Skills",
+    "Professional Skills", "Transferable Skills", "Work Experience",
+    "Professional Experience", "Employment History", "Internship Experience",
+    "Volunteer Experience", "Leadership Experience", "Research Experience",
+    "Teaching Experience",
+]
+
+# Every header as one alternation, longest first so that e.g. "work
+# experience" is preferred over "experience" at the same position. A
+# search from ``pos`` returns the earliest header at or after it, the same
+# position as the minimum of a str.find per header.
+_HEADER_ALTERNATION = '|'.join(
+    re.escape(header.lower()) for header in sorted(SECTION_HEADERS, key=len, reverse=True)
+)
+_ANY_HEADER = re.compile(_HEADER_ALTERNATION)
+# Headers that open a line, optionally followed by a colon
+_LINE_HEADER = re.compile(r'^[ \t]*(' + _HEADER_ALTERNATION + r')\b[ \t]*:?', re.MULTILINE)
+_SKILLS_HEADER = re.compile(r'Skills\s*[:\n]', re.IGNORECASE)
+
+
+class ResumeSections:
+    """
+    A resume lowercased once, from which the experience and skills text
+    and a dict of every headed section are extracted without rescanning.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.lower = text.lower()
+
+    @cached_property
+    def sections(self):
+        """
+        {header: content} for every header that opens a line, in order of
+        appearance; a header repeated later keeps its first section.
+        """
+        matches = list(_LINE_HEADER.finditer(self.lower))
+        sections = {}
+        for index, match in enumerate(matches):
+            end = matches[index + 1].start() if index + 1 < len(matches) else len(self.text)
+            sections.setdefault(match.group(1), self.text[match.end():end].strip())
+        return sections
+
+    def get(self, *headers):
+        """Content of the first of ``headers`` present, or ''"""
+        for header in headers:
+            if header.lower() in self.sections:
+                return self.sections[header.lower()]
+        return ''
+
+    @cached_property
+    def experience(self):
+        """
+        From the first mention of "experience" up to the next section
+        header anywhere after it.
+        """
+        start = self.lower.find("experience")
+        if start == -1:
+            return ""
+        match = _ANY_HEADER.search(self.lower, start + 1)
+        end = match.start() if match else len(self.text)
+        return self.text[start:end].strip()
+
+    @cached_property
+    def skills(self):
+        """Distinct skills listed after a "Skills:" header, up to the next blank line"""
+        match = _SKILLS_HEADER.search(self.text)
+        if not match:
+            return []
+        skills_start = match.end()
+        skills_end = self.text.find('\n\n', skills_start)
+        skills_section = self.text[skills_start:skills_end].strip()
+        extracted_skills = []
+        for line in skills_section.split('\n'):
+            line_skills = re.split(r'[:,-]', line)
+            extracted_skills.extend([skill.strip() for skill in line_skills if skill.strip()])
+        return list(set(extracted_skills))
+
+    @property
+    def education(self):
+        return self.get("Education")
+
+    @property
+    def certifications(self):
+        return self.get("Certifications", "Licenses")
@@ -1,26 +1,38 @@
+import datetime
+import os
 import re
 import string
-import spacy
-import torch
+import threading
+from dataclasses import dataclass
 import numpy as np
 from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
 from nltk.tokenize import word_tokenize
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import nltk
-from .nltk_utils import ensure_nltk_data
+from .encoders import (
+    BACKEND_TORCH,
+    DEFAULT_MICROBATCH_SIZE,
+    DEFAULT_MICROBATCH_TIMEOUT,
+    DEFAULT_MICROBATCH_WAIT_MS,
+    DEFAULT_MIN_SIMILARITY,
+    MicroBatchingEncoder,
+    build_encoder,
+)
+from .nltk_utils import ensure_nltk_data, get_lemmatizer, lemmatize
+from .sections import ResumeSections, SECTION_HEADERS
+from .term_matching import DATA_DIR, load_terms
 
-# Ensure NLTK data is available
-ensure_nltk_data()
+# spaCy, torch, sentence_transformers and sklearn are imported where they
+# are first needed, so importing this module (e.g. from manage.py commands
+# or URL loading) stays cheap; the model loads in the background at startup.
 
 class TextCleaner:
     def __init__(self) -> None:
+        # Ensure NLTK data is available
+        ensure_nltk_data()
         self.set_of_stopwords = set(stopwords.words("english") + list(string.punctuation))
         try:
-            self.lemmatizer = WordNetLemmatizer()
-            # Test lemmatizer to catch wordnet issues early
-            _ = self.lemmatizer.lemmatize("test")
+            # Shared lemmatizer; its first call catches wordnet issues early
+            self.lemmatizer = get_lemmatizer()
         except Exception as e:
             print(f"Lemmatizer fallback: {e}")
             self.lemmatizer = None
@@ -30,41 +42,253 @@ class TextCleaner:
         tokens = [token for token in tokens if token not in self.set_of_stopwords]
         if self.lemmatizer:
             try:
-                tokens = [self.lemmatizer.lemmatize(token) for token in tokens]
+                tokens = [lemmatize(token) for token in tokens]
             except Exception as e:
                 print(f"Lemmatization error during text cleaning: {e}")
         cleaned_text = " ".join(tokens)
         return cleaned_text
 
+    @property
+    def complete(self) -> bool:
+        """False when built without the lemmatizer (NLTK data missing)"""
+        return self.lemmatizer is not None
+
+_text_cleaner = None
+_text_cleaner_lock = threading.Lock()
+
+def get_text_cleaner():
+    """
+    Process-wide TextCleaner; it holds no per-call state. A cleaner built
+    without its lemmatizer is returned but not kept, so the process picks
+    up the NLTK data once it is installed instead of cleaning without
+    lemmatization until restarted.
+    """
+    global _text_cleaner
+    if _text_cleaner is None:
+        with _text_cleaner_lock:
+            if _text_cleaner is None:
+                cleaner = TextCleaner()
+                if not cleaner.complete:
+                    return cleaner
+                _text_cleaner = cleaner
+    return _text_cleaner
+
+@dataclass(frozen=True)
+class ResumeEntities:
+    """Structured fields found by the optional spaCy NER stage."""
+    organizations: list
+    dates: list
+    skills: list
+
+    @property
+    def experience_years(self) -> int:
+        """Span between the earliest and latest year mentioned in dates."""
+        years = []
+        for date in self.dates:
+            years.extend(int(year) for year in _YEAR_PATTERN.findall(date))
+            if _PRESENT_PATTERN.search(date):
+                years.append(datetime.date.today().year)
+        return max(years) - min(years) if years else 0
+
+    def as_dict(self):
+        return {
+            'organizations': self.organizations,
+            'dates': self.dates,
+            'skills': self.skills,
+            'experienceYears': self.experience_years,
+        }
+
+@dataclass(frozen=True)
+class PreparedResume:
+    """Sections extracted from one resume, raw and cleaned."""
+    experience: str
+    skills: list
+    cleaned_experience: str
+    cleaned_skills: str
+    entities: ResumeEntities = None
+
+    @property
+    def cleaned_text(self) -> str:
+        return self.cleaned_experience + " " + self.cleaned_skills
+
+@dataclass(frozen=True, eq=False)
+class SimilarityResult:
+    """Cosine similarity (0-1) of a resume to a job description."""
+    score: float
+    resume: PreparedResume
+    embedding: np.ndarray = None  # L2-normalised, e.g. for the embedding store
+
+# Number of texts passed to SentenceTransformer.encode per forward pass
+DEFAULT_BATCH_SIZE = 32
+
+# Long texts: 'mean' or 'max' pooling of window embeddings, tokens shared
+# by consecutive windows, and windows kept per text
+CHUNK_POOLING_MODES = ('mean', 'max')
+DEFAULT_CHUNK_OVERLAP = 64
+DEFAULT_MAX_CHUNKS = 8
+
+DEFAULT_NER_MODEL = 'en_core_web_sm'
+# Only the entity recognizer is needed; the rest of the pipeline is never
+# loaded. In the en_core_web_* sm/md/lg pipelines ner embeds tokens with
+# its own tok2vec layer, so the shared tok2vec only feeds the excluded pipes.
+NER_EXCLUDED_PIPES = ['tok2vec', 'tagger', 'parser', 'attribute_ruler', 'lemmatizer', 'senter']
+
+SKILLS_FILE = os.path.join(DATA_DIR, 'skills.txt')
+
+_YEAR_PATTERN = re.compile(r'\b(?:19|20)\d{2}\b')
+_PRESENT_PATTERN = re.compile(r'\b(?:present|current|now|today)\b', re.IGNORECASE)
+
 class ATS:
-    RESUME_SECTIONS = [
-        "Contact Information", "Objective", "Summary", "Education", "Experience", 
-        "Skills", "Projects", "Certifications", "Licenses", "Awards", "Honors", 
-        "Publications", "References", "Technical Skills", "Computer Skills", 
-        "Programming Languages", "Software Skills", "Soft Skills", "Language Skills", 
-        "Professional Skills", "Transferable Skills", "Work Experience", 
-        "Professional Experience", "Employment History", "Internship Experience", 
-        "Volunteer Experience", "Leadership Experience", "Research Experience", 
-        "Teaching Experience",
-    ]
-
-    def __init__(self):
-        try:
-            self.nlp = spacy.load('en_core_web_sm')
-        except OSError:
-            print("Warning: spaCy model 'en_core_web_sm' not found. Some features may be limited.")
-            self.nlp = None
+    RESUME_SECTIONS = SECTION_HEADERS
+
+    MODEL_NAME = 'all-mpnet-base-v2'
+    # Bump when section extraction or cleaning changes, so stored
+    # resume embeddings from the previous pipeline are not reused
+    EMBEDDING_VERSION = 1
+
+    def __init__(self, model_name=None, max_seq_length=None, embedding_dimension=None,
+                 enable_ner=False, ner_model=DEFAULT_NER_MODEL, backend=BACKEND_TORCH,
+                 verify_backend=True, min_similarity=DEFAULT_MIN_SIMILARITY, onnx_dir=None,
+                 chunk_long_texts=False, chunk_pooling='mean', chunk_overlap=DEFAULT_CHUNK_OVERLAP,
+                 max_chunks=DEFAULT_MAX_CHUNKS, micro_batching=False,
+                 micro_batch_wait_ms=DEFAULT_MICROBATCH_WAIT_MS, micro_batch_size=DEFAULT_MICROBATCH_SIZE,
+                 micro_batch_timeout=DEFAULT_MICROBATCH_TIMEOUT):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name or self.MODEL_NAME
+        # The spaCy NER stage is opt-in and loaded on first use, so workers
+        # that do not need it never pay for the pipeline.
+        self.enable_ner = enable_ner
+        self.ner_model = ner_model
+        self._nlp = None
+        self._nlp_lock = threading.Lock()
+
+        # Texts longer than max_seq_length are either truncated by the model
+        # or, with chunk_long_texts, encoded as overlapping windows and pooled
+        if chunk_pooling not in CHUNK_POOLING_MODES:
+            raise ValueError(f"Unknown chunk pooling '{chunk_pooling}'")
+        self.chunk_long_texts = chunk_long_texts
+        self.chunk_pooling = chunk_pooling
+        self.chunk_overlap = chunk_overlap
+        self.max_chunks = max_chunks
+        self.truncation_stats = {'texts': 0, 'truncated_texts': 0, 'truncated_tokens': 0, 'windows': 0}
+        self._stats_lock = threading.Lock()
         
         # Initialize SentenceTransformer on the target device
         try:
             # Try GPU first, fallback to CPU if CUDA is unavailable
             self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
             print(f"Initializing SentenceTransformer on device: {self.device}")
-            self.model = SentenceTransformer('all-mpnet-base-v2', device=self.device)
+            self.model = SentenceTransformer(self.model_name, device=self.device)
             print("SentenceTransformer model loaded successfully")
         except Exception as e:
             print(f"Failed to load model on GPU: {e}. Falling back to CPU.")
-            self.model = SentenceTransformer('all-mpnet-base-v2', device='cpu')
+            self.device = 'cpu'
+            self.model = SentenceTransformer(self.model_name, device='cpu')
+
+        # Longer inputs are truncated to max_seq_length tokens; lowering it
+        # trades recall on long resumes for speed
+        default_max_seq_length = self.model.max_seq_length
+        if max_seq_length:
+            self.model.max_seq_length = max_seq_length
+        self.max_seq_length = self.model.max_seq_length
+
+        # Embeddings can be truncated to their first ``embedding_dimension``
+        # components (Matryoshka-trained models keep most of their accuracy)
+        model_dimension = self.model.get_sentence_embedding_dimension()
+        if embedding_dimension and embedding_dimension > model_dimension:
+            raise ValueError(
+                f"Embedding dimension {embedding_dimension} exceeds the {model_dimension} "
+                f"dimensions of {self.model_name}"
+            )
+        self.embedding_dimension = embedding_dimension or model_dimension
+        self._custom_max_seq_length = self.max_seq_length != default_max_seq_length
+        self._truncate_embeddings = self.embedding_dimension < model_dimension
+
+        # Inference backend (fp32, int8-quantized or ONNX Runtime), checked
+        # against fp32 on sample texts; fp32 is kept if the check fails
+        self.encoder, self.backend_report = build_encoder(
+            self.model, self.model_name, backend=backend, device=self.device,
+            verify=verify_backend, min_similarity=min_similarity, onnx_dir=onnx_dir,
+        )
+        self.backend = self.encoder.backend
+        if self.backend != BACKEND_TORCH:
+            # Only the selected backend is used from here on
+            self.model = None
+
+        # Encode calls from concurrent requests share batches on one worker thread
+        if micro_batching:
+            self.encoder = MicroBatchingEncoder(
+                self.encoder, micro_batch_wait_ms, micro_batch_size, micro_batch_timeout
+            )
+
+    @property
+    def nlp(self):
+        """The spaCy NER pipeline, or None when the stage is disabled or unavailable."""
+        if not self.enable_ner:
+            return None
+        if self._nlp is None:
+            with self._nlp_lock:
+                if self._nlp is None:
+                    self._nlp = self._load_ner_pipeline()
+        return self._nlp if self._nlp is not False else None
+
+    def _load_ner_pipeline(self):
+        import spacy
+
+        try:
+            nlp = spacy.load(self.ner_model, exclude=NER_EXCLUDED_PIPES)
+        except OSError:
+            print(f"Warning: spaCy model '{self.ner_model}' not found. NER stage disabled.")
+            return False
+        ruler = nlp.add_pipe('entity_ruler', before='ner')
+        ruler.add_patterns([
+            {'label': 'SKILL', 'pattern': [{'LOWER': token} for token in skill.lower().split()]}
+            for skill in load_terms(SKILLS_FILE)
+        ])
+        return nlp
+
+    @property
+    def encoder_key(self) -> str:
+        """
+        Namespace for cached embeddings: the model plus any setting that
+        changes its vectors (non-fp32 backend, sequence length, dimension).
+        """
+        key = self.model_name
+        if self.backend != BACKEND_TORCH:
+            key += f"@{self.backend}"
+        if self._custom_max_seq_length:
+            key += f":len{self.max_seq_length}"
+        if self._truncate_embeddings:
+            key += f":dim{self.embedding_dimension}"
+        if self.chunk_long_texts:
+            key += f":chunk-{self.chunk_pooling}-{self.chunk_overlap}x{self.max_chunks}"
+        return key
+
+    @property
+    def store_key(self) -> str:
+        """Namespace for stored embeddings; the NER stage changes the encoded text."""
+        return self.encoder_key + ('+ner' if self.enable_ner else '')
+
+    def extract_entities(self, texts, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Run the NER stage over ``texts`` with one batched ``nlp.pipe`` call.
+        Returns a ResumeEntities per text, or None when NER is disabled.
+        """
+        nlp = self.nlp
+        if nlp is None:
+            return None
+        entities = []
+        for doc in nlp.pipe(texts, batch_size=batch_size):
+            found = {'ORG': [], 'DATE': [], 'SKILL': []}
+            for ent in doc.ents:
+                if ent.label_ in found and ent.text not in found[ent.label_]:
+                    found[ent.label_].append(ent.text)
+            entities.append(ResumeEntities(
+                organizations=found['ORG'], dates=found['DATE'], skills=found['SKILL']
+            ))
+        return entities
 
     def load_resume(self, resume_content):
         self.resume_content = resume_content
@@ -72,48 +296,205 @@ class ATS:
     def load_job_description(self, jd_content):
         self.jd_content = jd_content
 
-    def extract_experience(self):
-        experience_start = self.resume_content.lower().find("experience")
-        if experience_start == -1:
-            return ""
-        experience_end = len(self.resume_content)
-        for section in self.RESUME_SECTIONS:
-            section_start = self.resume_content.lower().find(section.lower(), experience_start + 1)
-            if section_start != -1:
-                experience_end = min(experience_end, section_start)
-        return self.resume_content[experience_start:experience_end].strip()
-
-    def extract_skills(self):
-        skills_pattern = re.compile(r'Skills\s*[:\n]', re.IGNORECASE)
-        skills_match = skills_pattern.search(self.resume_content)
-        if skills_match:
-            skills_start = skills_match.end()
-            skills_end = self.resume_content.find('\n\n', skills_start)
-            skills_section = self.resume_content[skills_start:skills_end].strip()
-            skills_lines = skills_section.split('\n')
-            extracted_skills = []
-            for line in skills_lines:
-                line_skills = re.split(r'[:,-]', line)
-                extracted_skills.extend([skill.strip() for skill in line_skills if skill.strip()])
-            return list(set(extracted_skills))
-        return []
+    def extract_sections(self, resume_content=None) -> ResumeSections:
+        """Segment a resume once; experience, skills and other sections share it."""
+        if resume_content is None:
+            resume_content = self.resume_content
+        return ResumeSections(resume_content)
+
+    def extract_experience(self, resume_content=None, sections=None):
+        if sections is None:
+            sections = self.extract_sections(resume_content)
+        return sections.experience
+
+    def extract_skills(self, resume_content=None, sections=None):
+        if sections is None:
+            sections = self.extract_sections(resume_content)
+        return sections.skills
 
     def clean_experience(self, experience):
-        cleaner = TextCleaner()
+        cleaner = get_text_cleaner()
         self.cleaned_experience = cleaner.clean_text(experience)
 
     def clean_skills(self, skills):
-        cleaner = TextCleaner()
+        cleaner = get_text_cleaner()
         self.cleaned_skills = cleaner.clean_text(skills)
 
-    def clean_jd(self):
-        cleaner = TextCleaner()
-        return cleaner.clean_text(self.jd_content)
+    def clean_jd(self, jd_content=None):
+        if jd_content is None:
+            jd_content = self.jd_content
+        cleaner = get_text_cleaner()
+        return cleaner.clean_text(jd_content)
 
     def compute_similarity(self):
+        from sklearn.metrics.pairwise import cosine_similarity
+
         cleaned_resume = self.cleaned_experience + " " + self.cleaned_skills
         cleaned_jd_text = self.clean_jd()
-        resume_embedding = self.model.encode([cleaned_resume])
-        jd_embedding = self.model.encode([cleaned_jd_text])
+        resume_embedding = self.encode([cleaned_resume])
+        jd_embedding = self.encode([cleaned_jd_text])
         similarity_score = cosine_similarity(resume_embedding, jd_embedding)[0][0]
-        return similarity_score
\ No newline at end of file
+        return similarity_score
+
+    # Stateless API. Nothing below touches per-request attributes on ``self``,
+    # so one ATS instance (and its model) can be shared by concurrent threads.
+
+    def prepare_resume(self, resume_content, entities=None) -> PreparedResume:
+        """
+        Extract and clean the experience and skills sections of a resume.
+        Skills found by the NER stage (``entities``) are added to those
+        listed under a Skills heading.
+        """
+        cleaner = get_text_cleaner()
+        sections = self.extract_sections(resume_content)
+        experience = sections.experience
+        skills = sections.skills
+        if entities is not None:
+            listed = {skill.lower() for skill in skills}
+            skills = skills + [skill for skill in entities.skills if skill.lower() not in listed]
+        return PreparedResume(
+            experience=experience,
+            skills=skills,
+            cleaned_experience=cleaner.clean_text(experience),
+            cleaned_skills=cleaner.clean_text(" ".join(skills)),
+            entities=entities,
+        )
+
+    def encode(self, texts, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Encode ``texts`` into an (n, dim) array of L2-normalised embeddings.
+
+        Texts over the model's token limit are truncated, or with
+        chunk_long_texts split into overlapping windows; the windows of all
+        texts go through one batched encode and are pooled per text.
+        """
+        texts = list(texts)
+        windows, counts, truncated = self._split_windows(texts)
+        self._record_truncation(truncated, len(windows))
+
+        embeddings = self.encoder.encode(windows, batch_size)
+        if len(windows) > len(texts):
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            if self.chunk_pooling == 'max':
+                embeddings = np.maximum.reduceat(embeddings, starts, axis=0)
+            else:
+                embeddings = np.add.reduceat(embeddings, starts, axis=0) / np.asarray(counts)[:, None]
+            embeddings = self._normalize(embeddings)
+
+        if self._truncate_embeddings and len(embeddings):
+            embeddings = self._normalize(embeddings[:, :self.embedding_dimension])
+        return embeddings
+
+    def _split_windows(self, texts):
+        """
+        Return (windows, windows per text, truncated tokens per text). A text
+        within the token limit is its own single window.
+        """
+        if not texts:
+            return [], [], []
+        tokenizer = self.encoder.tokenizer
+        limit = self.max_seq_length - tokenizer.num_special_tokens_to_add()
+        offsets = tokenizer(
+            texts, add_special_tokens=False, return_offsets_mapping=True
+        )['offset_mapping']
+
+        windows, counts, truncated = [], [], []
+        for text, text_offsets in zip(texts, offsets):
+            length = len(text_offsets)
+            if not self.chunk_long_texts or length <= limit:
+                windows.append(text)
+                counts.append(1)
+                truncated.append(max(length - limit, 0))
+                continue
+            # Windows always advance by at least half their length
+            step = limit - min(self.chunk_overlap, limit // 2)
+            start, count = 0, 0
+            while True:
+                end = min(start + limit, length)
+                windows.append(text[text_offsets[start][0]:text_offsets[end - 1][1]])
+                count += 1
+                if end == length or count == self.max_chunks:
+                    break
+                start += step
+            counts.append(count)
+            truncated.append(length - end)
+        return windows, counts, truncated
+
+    def _record_truncation(self, truncated, windows):
+        """Running totals of encoded texts and the tokens the model never saw"""
+        with self._stats_lock:
+            self.truncation_stats['texts'] += len(truncated)
+            self.truncation_stats['windows'] += windows
+            self.truncation_stats['truncated_texts'] += sum(1 for tokens in truncated if tokens)
+            self.truncation_stats['truncated_tokens'] += sum(truncated)
+
+    @staticmethod
+    def _normalize(embeddings):
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def compute_similarity_batch(self, cleaned_resumes, cleaned_jd_text, batch_size=DEFAULT_BATCH_SIZE,
+                                 jd_embedding=None, resume_embeddings=None):
+        """
+        Score many cleaned resumes against one cleaned job description.
+
+        The job description is encoded once (or not at all when a cached
+        ``jd_embedding`` is given) and all resumes are encoded in a single
+        batched call, unless their ``resume_embeddings`` are already known
+        (e.g. from the embedding store); embeddings are L2-normalised so the
+        cosine scores reduce to one matrix-vector product.
+        """
+        if not cleaned_resumes:
+            return np.zeros(0, dtype=np.float32)
+        if jd_embedding is None:
+            jd_embedding = self.encode([cleaned_jd_text])[0]
+        if resume_embeddings is None:
+            resume_embeddings = self.encode(cleaned_resumes, batch_size=batch_size)
+        return resume_embeddings @ jd_embedding
+
+    def embed_resumes(self, resume_texts, batch_size=DEFAULT_BATCH_SIZE, entities=None):
+        """
+        Prepare and encode resumes in one batched call. Returns the list of
+        PreparedResume objects and the (n, dim) normalised embedding matrix.
+        ``entities`` are NER results already computed for ``resume_texts``.
+        """
+        if entities is None:
+            entities = self.extract_entities(resume_texts) or [None] * len(resume_texts)
+        prepared = [
+            self.prepare_resume(resume_text, resume_entities)
+            for resume_text, resume_entities in zip(resume_texts, entities)
+        ]
+        if not prepared:
+            return prepared, np.zeros((0, 0), dtype=np.float32)
+        embeddings = self.encode([resume.cleaned_text for resume in prepared], batch_size=batch_size)
+        return prepared, embeddings
+
+    def score(self, resume_content, jd_content) -> SimilarityResult:
+        """Semantic similarity of a single resume to a job description."""
+        return self.score_batch([resume_content], jd_content)[0]
+
+    def score_batch(self, resume_texts, jd_content, batch_size=DEFAULT_BATCH_SIZE, jd_artifacts=None,
+                    entities=None):
+        """
+        Return a SimilarityResult for every resume in ``resume_texts``, in
+        input order, scored against ``jd_content``.
+
+        ``jd_artifacts`` (see jd_cache) supplies the already cleaned and
+        encoded job description so no JD-side work is repeated.
+        ``entities`` are NER results already computed for ``resume_texts``.
+        """
+        prepared, embeddings = self.embed_resumes(resume_texts, batch_size=batch_size, entities=entities)
+        if jd_artifacts is not None:
+            cleaned_jd_text, jd_embedding = jd_artifacts.cleaned_text, jd_artifacts.embedding
+        else:
+            cleaned_jd_text, jd_embedding = self.clean_jd(jd_content), None
+        scores = self.compute_similarity_batch(
+            [resume.cleaned_text for resume in prepared],
+            cleaned_jd_text,
+            jd_embedding=jd_embedding,
+            resume_embeddings=embeddings,
+        )
+        return [
+            SimilarityResult(score=float(score), resume=resume, embedding=embedding)
+            for score, resume, embedding in zip(scores, prepared, embeddings)
+        ]
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
-from .models import User
+from .models import ScoringJob, User
 
 class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True, write_only=True)
@@ -22,4 +22,22 @@ class ChangePasswordSerializer(serializers.Serializer):
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ["id", "username", "email", "must_change_password"]
\ No newline at end of file
+        fields = ["id", "username", "email", "must_change_password"]
+
+class ScoringJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.UUIDField(source='id', read_only=True)
+    # Keyword filtering of the job's results uses the job id as batch id
+    batch_id = serializers.UUIDField(source='id', read_only=True)
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ScoringJob
+        fields = [
+            "job_id", "batch_id", "status", "job_role", "keyword_weight", "total_files", "processed_files",
+            "progress", "results", "error", "created_at", "started_at", "finished_at",
+        ]
+
+    def get_progress(self, obj):
+        if not obj.total_files:
+            return 100
+        return round(100 * obj.processed_files / obj.total_files)
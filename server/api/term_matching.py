@@ -0,0 +1,87 @@
+import functools
+import os
+import re
+from collections import Counter
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+def load_terms(path):
+    """Read a one-term-per-line data file, skipping blanks and # comments."""
+    with open(path, encoding='utf-8') as terms_file:
+        return [
+            line.strip() for line in terms_file
+            if line.strip() and not line.lstrip().startswith('#')
+        ]
+
+
+def _trie_pattern(node):
+    """
+    Regex source for a character trie. node[''] marks the end of a term and
+    holds the name of an empty group recording which term matched.
+    """
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if '' in node:
+        # Tried after the longer branches: longest match wins
+        branches.append(f"(?P<{node['']}>)")
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')'
+
+
+class TermMatcher:
+    """
+    Finds every occurrence of a fixed set of terms in one left-to-right
+    scan. The terms are merged into a character trie and compiled into a
+    single regex, so each text position follows one trie path whatever the
+    number of terms, instead of trying every term in turn.
+
+    Matches do not overlap; where terms share a start the longest wins
+    ("Certified Scrum Master" over "Scrum Master"). With ``whole_words`` a
+    match must not be preceded or followed by a word character.
+
+    Each term ends in its own empty named group, so the term of a match is
+    read from ``match.lastgroup`` rather than looked up by the matched
+    text, which under IGNORECASE may not lowercase to the term ("İ", "ſ").
+    """
+
+    def __init__(self, terms, ignore_case=True, whole_words=True):
+        self.ignore_case = ignore_case
+        self.terms = list(dict.fromkeys(term.strip() for term in terms if term.strip()))
+        self._group_terms = {}
+        trie = {}
+        for term in self.terms:
+            node = trie
+            for char in self._key(term):
+                node = node.setdefault(char, {})
+            # Terms differing only in case share the first one's group
+            if '' not in node:
+                node[''] = f't{len(self._group_terms)}'
+                self._group_terms[node['']] = term
+
+        source = _trie_pattern(trie) if trie else '(?!)'
+        if whole_words:
+            source = r'(?<!\w)(?:' + source + r')(?!\w)'
+        self.pattern = re.compile(source, re.IGNORECASE if ignore_case else 0)
+
+    def _key(self, text):
+        return text.lower() if self.ignore_case else text
+
+    def term_of(self, match):
+        """The configured term a match of ``pattern`` stands for"""
+        return self._group_terms[match.lastgroup]
+
+    def finditer(self, text):
+        """Yield (term, match) for every occurrence in ``text``"""
+        for match in self.pattern.finditer(text):
+            yield self.term_of(match), match
+
+    def counts(self, text):
+        """Counter of occurrences per term (terms absent from ``text`` omitted)"""
+        return Counter(self.term_of(match) for match in self.pattern.finditer(text))
+
+
+@functools.lru_cache(maxsize=128)
+def get_matcher(terms, ignore_case=True, whole_words=True):
+    """Cached TermMatcher for a tuple of terms; compiled once per term set."""
+    return TermMatcher(terms, ignore_case=ignore_case, whole_words=whole_words)
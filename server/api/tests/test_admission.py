@@ -0,0 +1,136 @@
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from api.admission import AdmissionController, AdmissionRejected
+
+
+def _wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition not reached in time")
+        time.sleep(0.005)
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    def _admit_in_thread(self, controller, user_key, weight, timeout=5):
+        """Start admit() in a thread; returns (thread, outcome) where outcome gets the ticket or error"""
+        outcome = {}
+
+        def run():
+            try:
+                outcome['ticket'] = controller.admit(user_key, weight, timeout)
+            except AdmissionRejected as e:
+                outcome['error'] = e
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread, outcome
+
+    def test_admits_up_to_capacity_then_times_out(self):
+        controller = AdmissionController(4, max_wait=0.05)
+        tickets = [controller.admit('a', 2), controller.admit('b', 2)]
+        self.assertEqual(controller.in_flight, 4)
+        with self.assertRaises(AdmissionRejected) as raised:
+            controller.admit('c', 1)
+        self.assertEqual(raised.exception.reason, 'timed out waiting')
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+        for ticket in tickets:
+            ticket.release()
+        self.assertEqual(controller.in_flight, 0)
+        self.assertFalse(controller._queue)
+
+    def test_weight_above_capacity_is_clamped(self):
+        controller = AdmissionController(4, per_user_capacity=3)
+        with controller.admit('a', 10) as ticket:
+            self.assertEqual(ticket.weight, 3)
+            self.assertEqual(controller.in_flight, 3)
+        self.assertEqual(controller.in_flight, 0)
+
+    def test_release_is_idempotent(self):
+        controller = AdmissionController(4)
+        ticket = controller.admit('a', 2)
+        other = controller.admit('b', 1)
+        ticket.release()
+        ticket.release()
+        self.assertEqual(controller.in_flight, 1)
+        other.release()
+        self.assertEqual(controller.in_flight, 0)
+        self.assertEqual(controller._per_user, {})
+
+    def test_per_user_limit(self):
+        controller = AdmissionController(4, per_user_capacity=2, max_wait=0.05)
+        held = controller.admit('a', 2)
+        with self.assertRaises(AdmissionRejected):
+            controller.admit('a', 1)
+        with controller.admit('b', 2):
+            self.assertEqual(controller.in_flight, 4)
+        held.release()
+
+    def test_waiters_are_admitted_in_arrival_order(self):
+        controller = AdmissionController(2)
+        first_units = controller.admit('x', 1)
+        second_units = controller.admit('y', 1)
+        large, large_outcome = self._admit_in_thread(controller, 'a', 2)
+        _wait_until(lambda: len(controller._queue) == 1)
+        small, small_outcome = self._admit_in_thread(controller, 'b', 1)
+        _wait_until(lambda: len(controller._queue) == 2)
+
+        # One unit is free: enough for the later, smaller request, but the
+        # larger one queued first keeps its place
+        first_units.release()
+        time.sleep(0.05)
+        self.assertEqual(large_outcome, {})
+        self.assertEqual(small_outcome, {})
+
+        second_units.release()
+        large.join(2)
+        self.assertEqual(large_outcome['ticket'].weight, 2)
+        self.assertEqual(small_outcome, {})
+
+        large_outcome['ticket'].release()
+        small.join(2)
+        self.assertEqual(small_outcome['ticket'].weight, 1)
+        small_outcome['ticket'].release()
+        self.assertEqual(controller.in_flight, 0)
+
+    def test_waiter_held_by_own_user_limit_lets_others_pass(self):
+        controller = AdmissionController(4, per_user_capacity=1)
+        held = controller.admit('a', 1)
+        blocked, blocked_outcome = self._admit_in_thread(controller, 'a', 1)
+        _wait_until(lambda: len(controller._queue) == 1)
+
+        ticket = controller.admit('b', 1, timeout=0.5)
+        self.assertEqual(controller.in_flight, 2)
+        self.assertEqual(blocked_outcome, {})
+        ticket.release()
+
+        held.release()
+        blocked.join(2)
+        blocked_outcome['ticket'].release()
+        self.assertEqual(controller.in_flight, 0)
+
+    def test_full_queue_rejects_at_once(self):
+        controller = AdmissionController(1, max_queue=1)
+        held = controller.admit('x', 1)
+        waiting, waiting_outcome = self._admit_in_thread(controller, 'a', 1)
+        _wait_until(lambda: len(controller._queue) == 1)
+
+        started = time.monotonic()
+        with self.assertRaises(AdmissionRejected) as raised:
+            controller.admit('b', 1, timeout=5)
+        self.assertEqual(raised.exception.reason, 'queue full')
+        self.assertLess(time.monotonic() - started, 1)
+
+        # Callers that wait without a limit (background jobs) still queue
+        unlimited, unlimited_outcome = self._admit_in_thread(controller, 'c', 1, timeout=None)
+        _wait_until(lambda: len(controller._queue) == 2)
+
+        held.release()
+        waiting.join(2)
+        waiting_outcome['ticket'].release()
+        unlimited.join(2)
+        unlimited_outcome['ticket'].release()
+        self.assertEqual(controller.in_flight, 0)
@@ -0,0 +1,41 @@
+from django.test import TestCase
+
+from api import batch_store
+from api.job_matcher import compute_component_scores, compute_final_scores
+from api.models import ResumeBatch, User
+
+JOB_DESC = "Python developer with Django experience who presented and managed projects"
+TEXTS = [
+    "Python and Django developer, 4 years experience, presented at conferences",
+    "HR manager with 8 years experience. PMP, Six Sigma. Managed and negotiated hiring",
+]
+
+
+class RerankBatchTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='hr', email='hr@example.com', password='secret')
+        self.batch = batch_store.create_batch(user, 'Software Engineer', 0.5, JOB_DESC)
+        components = compute_component_scores(TEXTS, JOB_DESC)
+        self.semantic_scores = [62.0, 35.0]
+        batch_store.add_resumes(self.batch, [
+            (f'resume{index}.pdf', text, f'hash{index}', components[index], self.semantic_scores[index],
+             {'resume': f'resume{index}.pdf', 'score': 0, 'keywordScore': 0, 'semanticScore': 0})
+            for index, text in enumerate(TEXTS)
+        ] + [('broken.pdf', '', None, None, 0.0, {'resume': 'broken.pdf', 'score': 0})])
+
+    def test_matches_full_rescoring(self):
+        results = batch_store.rerank_batch(self.batch, 'HR Manager', 0.8)
+
+        keyword_scores = compute_final_scores(TEXTS, JOB_DESC, 'HR Manager')
+        for result, keyword_score, semantic_score in zip(results, keyword_scores, self.semantic_scores):
+            self.assertEqual(result['keywordScore'], round(keyword_score))
+            self.assertEqual(result['score'], round(keyword_score * 0.8 + semantic_score * 0.2))
+        self.assertEqual((results[2]['score'], results[2]['keywordScore']), (0, 0))
+
+    def test_saves_scores_and_settings(self):
+        results = batch_store.rerank_batch(self.batch, 'Sales Manager', 0.3)
+
+        batch = ResumeBatch.objects.get(pk=self.batch.pk)
+        self.assertEqual((batch.job_role, batch.keyword_weight), ('Sales Manager', 0.3))
+        self.assertEqual([row.result for row in batch.resumes.all()], results)
+        self.assertEqual(results[0]['resume'], 'resume0.pdf')
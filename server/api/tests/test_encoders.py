@@ -0,0 +1,127 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from api.encoders import MicroBatchingEncoder
+
+
+class GatedEncoder:
+    """
+    Embeds each text as [its number]. The first call blocks until
+    ``release`` is set, so later calls pile up in the micro-batch queue.
+    A text 'bad' makes the whole call fail.
+    """
+
+    backend = 'fake'
+    tokenizer = None
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def encode(self, texts, batch_size):
+        self.calls.append(list(texts))
+        if len(self.calls) == 1:
+            self.started.set()
+            self.release.wait(5)
+        if 'bad' in texts:
+            raise ValueError('bad text')
+        return np.array([[float(text)] for text in texts])
+
+
+class MicroBatchingEncoderTests(SimpleTestCase):
+    def encode_concurrently(self, calls):
+        """Block the worker on a first call, queue ``calls`` behind it, then let everything run."""
+        inner = GatedEncoder()
+        encoder = MicroBatchingEncoder(inner, max_wait_ms=0, max_batch_size=100)
+        with ThreadPoolExecutor(len(calls) + 1) as pool:
+            first = pool.submit(encoder.encode, ['0'], 8)
+            self.assertTrue(inner.started.wait(5))
+            futures = [pool.submit(encoder.encode, texts, 8) for texts in calls]
+            while len(encoder._queue) < len(calls):
+                threading.Event().wait(0.005)
+            inner.release.set()
+            np.testing.assert_array_equal(first.result(5), [[0.0]])
+            outcomes = []
+            for future in futures:
+                try:
+                    outcomes.append(future.result(5))
+                except ValueError as e:
+                    outcomes.append(e)
+        return inner, outcomes
+
+    def test_queued_calls_share_one_batch_and_get_their_own_rows(self):
+        inner, outcomes = self.encode_concurrently([['1', '2'], ['3'], ['4', '5', '6']])
+
+        self.assertEqual(len(inner.calls), 2)
+        self.assertEqual(sorted(inner.calls[1]), ['1', '2', '3', '4', '5', '6'])
+        np.testing.assert_array_equal(outcomes[0], [[1.0], [2.0]])
+        np.testing.assert_array_equal(outcomes[1], [[3.0]])
+        np.testing.assert_array_equal(outcomes[2], [[4.0], [5.0], [6.0]])
+
+    def test_failed_batch_is_retried_per_call(self):
+        inner, outcomes = self.encode_concurrently([['1'], ['bad', '2'], ['3']])
+
+        np.testing.assert_array_equal(outcomes[0], [[1.0]])
+        self.assertIsInstance(outcomes[1], ValueError)
+        np.testing.assert_array_equal(outcomes[2], [[3.0]])
+        # The shared batch, then each call on its own
+        self.assertEqual(len(inner.calls), 5)
+
+    def test_single_call_error_is_raised(self):
+        encoder = MicroBatchingEncoder(GatedEncoder())
+        encoder.encoder.release.set()
+        with self.assertRaises(ValueError):
+            encoder.encode(['bad'], 8)
+
+    def test_max_batch_size_splits_the_queue(self):
+        inner = GatedEncoder()
+        encoder = MicroBatchingEncoder(inner, max_wait_ms=0, max_batch_size=3)
+        with ThreadPoolExecutor(4) as pool:
+            first = pool.submit(encoder.encode, ['0'], 8)
+            self.assertTrue(inner.started.wait(5))
+            futures = [pool.submit(encoder.encode, [str(index)] * 2, 8) for index in range(1, 4)]
+            while len(encoder._queue) < 3:
+                threading.Event().wait(0.005)
+            inner.release.set()
+            first.result(5)
+            for index, future in enumerate(futures, 1):
+                np.testing.assert_array_equal(future.result(5), [[float(index)]] * 2)
+        # 2 + 2 texts reach the limit of 3; the third call gets its own batch
+        self.assertEqual([len(call) for call in inner.calls], [1, 4, 2])
+
+    def test_worker_death_fails_the_batch_instead_of_hanging(self):
+        class Fatal(BaseException):
+            pass
+
+        inner = GatedEncoder()
+        inner.release.set()
+        encoder = MicroBatchingEncoder(inner, timeout=5)
+        # The error escapes the worker thread; keep its traceback out of the output
+        with mock.patch.object(inner, 'encode', side_effect=Fatal), \
+                mock.patch('threading.excepthook', lambda args: None):
+            with self.assertRaises(RuntimeError):
+                encoder.encode(['1'], 8)
+            encoder._worker.join(5)
+        self.assertFalse(encoder._worker.is_alive())
+
+        # The next call starts a new worker
+        np.testing.assert_array_equal(encoder.encode(['2'], 8), [[2.0]])
+
+    def test_callers_give_up_after_the_timeout(self):
+        inner = GatedEncoder()
+        encoder = MicroBatchingEncoder(inner, max_wait_ms=0, timeout=0.2)
+        with self.assertRaises(TimeoutError):
+            encoder.encode(['1'], 8)  # blocks the worker
+        with self.assertRaises(TimeoutError):
+            encoder.encode(['2'], 8)  # queued behind it
+
+        inner.release.set()
+        encoder.timeout = 5
+        np.testing.assert_array_equal(encoder.encode(['3'], 8), [[3.0]])
+        # The abandoned queued call was never encoded
+        self.assertEqual(inner.calls, [['1'], ['3']])
@@ -0,0 +1,86 @@
+import os
+import time
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+
+from api import file_parsing
+from api.file_parsing import PDF_CONTENT_TYPE, parse_uploads
+
+
+def fake_extract(task_id, source, content_type):
+    """
+    Stands in for _extract_in_worker: b'hang' never returns, b'crash'
+    kills its worker, b'sleep:<s>' returns after <s> seconds, anything
+    else is returned as text. Runs in spawned workers, so it lives at
+    module level and needs no Django setup.
+    """
+    file_parsing._started_queue.put((task_id, os.getpid(), time.time()))
+    if source == b'hang':
+        time.sleep(3600)
+    if source == b'crash':
+        os._exit(1)
+    if source.startswith(b'sleep:'):
+        time.sleep(float(source[6:]))
+    return source.decode()
+
+
+def fake_submit(pool, task_id, source, content_type):
+    return pool.executor.submit(fake_extract, task_id, source, content_type)
+
+
+def upload(content):
+    return SimpleUploadedFile('resume.pdf', content, content_type=PDF_CONTENT_TYPE)
+
+
+@mock.patch.object(file_parsing._ParsePool, 'submit', fake_submit)
+class ParsePoolTests(SimpleTestCase):
+    def tearDown(self):
+        if file_parsing._pool is not None:
+            file_parsing._discard_pool(file_parsing._pool)
+
+    def parse(self, contents, timeout):
+        return dict(parse_uploads(enumerate(upload(content) for content in contents), timeout=timeout))
+
+    @override_settings(ATS_PARSE_WORKERS=2)
+    def test_hung_file_times_out_and_other_files_are_requeued(self):
+        results = self.parse([b'hang', b'sleep:0.3', b'one', b'two'], timeout=2)
+
+        self.assertEqual(results, {0: '', 1: 'sleep:0.3', 2: 'one', 3: 'two'})
+
+    @override_settings(ATS_PARSE_WORKERS=2)
+    def test_only_the_stuck_worker_is_terminated(self):
+        pool = file_parsing._get_pool()
+        killed = []
+        original_kill = pool.kill
+
+        def kill(task_id):
+            killed.append(pool.started(task_id)[0])
+            original_kill(task_id)
+
+        with mock.patch.object(pool, 'kill', kill):
+            self.assertEqual(self.parse([b'hang', b'one', b'two'], timeout=1), {0: '', 1: 'one', 2: 'two'})
+
+        self.assertEqual(len(killed), 1)
+        self.assertTrue(pool.killed_worker)
+
+    @override_settings(ATS_PARSE_WORKERS=1)
+    def test_timeout_runs_from_worker_start(self):
+        # Each file takes most of the timeout; the second one waits longer
+        # than the timeout in the queue and must still not time out
+        results = self.parse([b'sleep:1.2', b'sleep:1.2'], timeout=2)
+
+        self.assertEqual(results, {0: 'sleep:1.2', 1: 'sleep:1.2'})
+
+    @override_settings(ATS_PARSE_WORKERS=2)
+    def test_crashing_file_is_retried_once_then_fails_alone(self):
+        results = self.parse([b'crash', b'one', b'two'], timeout=10)
+
+        self.assertEqual(results, {0: '', 1: 'one', 2: 'two'})
+
+    @override_settings(ATS_PARSE_WORKERS=2)
+    def test_unsupported_files_are_skipped(self):
+        docs = [upload(b'one'), SimpleUploadedFile('notes.txt', b'x', content_type='text/plain')]
+
+        self.assertEqual(dict(parse_uploads(enumerate(docs), timeout=5)), {0: 'one', 1: ''})
@@ -0,0 +1,72 @@
+from django.test import SimpleTestCase
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from api.job_matcher import (
+    ROLE_WEIGHTS,
+    compute_final_score,
+    compute_final_scores,
+    compute_keyword_match,
+    compute_keyword_matches,
+    term_counts,
+)
+
+JOB_DESC = (
+    "Senior Python developer with Django and AWS experience. "
+    "Lead a team, presented designs and managed REST APIs."
+)
+
+RESUMES = [
+    "Python developer, 5 years of Django and REST APIs. AWS Certified. Managed a team of four.",
+    "Sales manager with 10 years experience. Negotiated contracts and presented to clients. PMP",
+    "Data scientist: python, pandas, machine learning; communicated results. Six Sigma, Scrum Master",
+    "",
+    "the and of",  # stop words only
+    "Java java JAVA developer 2 year experience, lead engineer",
+]
+
+
+def tfidf_keyword_match(text, job_desc):
+    """The original implementation: a TfidfVectorizer fitted on the pair."""
+    try:
+        vectors = TfidfVectorizer(stop_words='english').fit_transform([text, job_desc])
+    except ValueError:
+        return 0.0
+    return cosine_similarity(vectors[0], vectors[1])[0][0] * 100
+
+
+class KeywordMatchTests(SimpleTestCase):
+    def test_single_matches_tfidf_vectorizer(self):
+        for text in RESUMES:
+            with self.subTest(text=text):
+                self.assertAlmostEqual(
+                    compute_keyword_match(text, JOB_DESC), tfidf_keyword_match(text, JOB_DESC), places=9
+                )
+
+    def test_batch_matches_single(self):
+        scores = compute_keyword_matches(RESUMES, JOB_DESC)
+        self.assertEqual(len(scores), len(RESUMES))
+        for text, score in zip(RESUMES, scores):
+            with self.subTest(text=text):
+                self.assertAlmostEqual(score, compute_keyword_match(text, JOB_DESC), places=9)
+
+    def test_cached_jd_terms(self):
+        jd_terms = term_counts(JOB_DESC)
+        self.assertAlmostEqual(
+            compute_keyword_match(RESUMES[0], JOB_DESC, jd_terms), compute_keyword_match(RESUMES[0], JOB_DESC)
+        )
+
+    def test_batch_without_any_terms(self):
+        self.assertEqual(list(compute_keyword_matches(["", "the and"], JOB_DESC)), [0.0, 0.0])
+
+
+class FinalScoreTests(SimpleTestCase):
+    def test_batch_matches_single_for_every_role(self):
+        for role in ROLE_WEIGHTS:
+            scores = compute_final_scores(RESUMES, JOB_DESC, role)
+            for text, score in zip(RESUMES, scores):
+                with self.subTest(role=role, text=text):
+                    self.assertAlmostEqual(score, compute_final_score(text, JOB_DESC, role), places=9)
+
+    def test_empty_batch(self):
+        self.assertEqual(len(compute_final_scores([], JOB_DESC, "HR Manager")), 0)
@@ -0,0 +1,82 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from api.jobs import _heartbeat, claim_next_job
+from api.models import ScoringJob, User
+
+
+@override_settings(ATS_JOB_STALE_AFTER=600)
+class ClaimNextJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='hr', email='hr@example.com', password='secret')
+
+    def make_job(self, status=ScoringJob.STATUS_QUEUED, updated_ago=0):
+        job = ScoringJob.objects.create(user=self.user, job_role='HR Manager', jd_text='jd', status=status)
+        if updated_ago:
+            ScoringJob.objects.filter(pk=job.pk).update(
+                updated_at=timezone.now() - timedelta(seconds=updated_ago)
+            )
+        return job
+
+    def test_claims_oldest_queued_job(self):
+        first = self.make_job()
+        second = self.make_job()
+
+        claimed = claim_next_job()
+
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual(claimed.status, ScoringJob.STATUS_RUNNING)
+        self.assertIsNotNone(claimed.started_at)
+        self.assertEqual(claim_next_job().pk, second.pk)
+        self.assertIsNone(claim_next_job())
+
+    def test_skips_live_running_and_finished_jobs(self):
+        self.make_job(status=ScoringJob.STATUS_RUNNING)
+        self.make_job(status=ScoringJob.STATUS_COMPLETED, updated_ago=3600)
+        self.make_job(status=ScoringJob.STATUS_FAILED, updated_ago=3600)
+
+        self.assertIsNone(claim_next_job())
+
+    def test_reclaims_stale_running_job_and_resets_progress(self):
+        job = self.make_job(status=ScoringJob.STATUS_RUNNING, updated_ago=3600)
+        ScoringJob.objects.filter(pk=job.pk).update(processed_files=3, results=[{'name': 'a.pdf'}], error='x')
+
+        claimed = claim_next_job()
+
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, ScoringJob.STATUS_RUNNING)
+        self.assertEqual(claimed.processed_files, 0)
+        self.assertEqual(claimed.results, [])
+        self.assertEqual(claimed.error, '')
+        self.assertIsNone(claim_next_job())
+
+
+@override_settings(ATS_JOB_STALE_AFTER=4)  # heartbeat every second
+class HeartbeatTests(TransactionTestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='hr', email='hr@example.com', password='secret')
+        self.job = ScoringJob.objects.create(
+            user=user, job_role='HR Manager', jd_text='jd', status=ScoringJob.STATUS_RUNNING
+        )
+        self.long_ago = timezone.now() - timedelta(hours=1)
+        ScoringJob.objects.filter(pk=self.job.pk).update(updated_at=self.long_ago)
+
+    def updated_at(self):
+        return ScoringJob.objects.get(pk=self.job.pk).updated_at
+
+    def test_keeps_a_slow_job_from_being_reclaimed(self):
+        with _heartbeat(self.job):
+            time.sleep(1.5)
+            self.assertGreater(self.updated_at(), self.long_ago)
+            self.assertIsNone(claim_next_job())
+
+    def test_stops_with_the_block(self):
+        with _heartbeat(self.job):
+            pass
+        self.assertFalse(any(thread.name.startswith('ats-job-heartbeat') for thread in threading.enumerate()))
+        time.sleep(1.2)
+        self.assertEqual(self.updated_at(), self.long_ago)
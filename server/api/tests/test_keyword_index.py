@@ -0,0 +1,38 @@
+from django.test import SimpleTestCase
+
+from api.keyword_index import QuerySyntaxError, parse_query
+
+
+class ParseQueryTests(SimpleTestCase):
+    def test_adjacent_terms_are_anded_and_commas_are_or(self):
+        self.assertEqual(parse_query('python django')[0], '"python" AND "django"')
+        self.assertEqual(parse_query('python, django')[0], '"python" OR "django"')
+
+    def test_phrases_and_prefixes(self):
+        expression, terms = parse_query('"machine learning" pyth*')
+        self.assertEqual(expression, '"machine learning" AND "pyth"*')
+        self.assertEqual(terms, {'machine learning': '"machine learning"', 'pyth*': '"pyth"*'})
+
+    def test_not_is_written_as_binary_not(self):
+        self.assertEqual(parse_query('python NOT django')[0], '"python" NOT "django"')
+        self.assertEqual(parse_query('python AND NOT django')[0], '"python" NOT "django"')
+        self.assertEqual(parse_query('(python OR java) AND NOT aws')[0], '( "python" OR "java" ) NOT "aws"')
+
+    def test_terms_are_quoted(self):
+        self.assertEqual(parse_query('NEAR(a b)')[0], '"NEAR" AND ( "a" AND "b" )')
+        self.assertEqual(parse_query('c++, c#')[0], '"c++" OR "c#"')
+        self.assertEqual(parse_query('python python')[1], {'python': '"python"'})
+
+    def test_empty_comma_operands_are_skipped(self):
+        self.assertEqual(parse_query('python,')[0], '"python"')
+        self.assertEqual(parse_query('python,,java')[0], '"python" OR "java"')
+        self.assertEqual(parse_query(', python , , java ,')[0], '"python" OR "java"')
+        self.assertEqual(parse_query('python, ""')[0], '"python"')
+        self.assertEqual(parse_query('(python, java,) aws')[0], '( "python" OR "java" ) AND "aws"')
+        self.assertEqual(parse_query('python AND (,java)')[0], '"python" AND ( "java" )')
+
+    def test_syntax_errors(self):
+        for query in ('', '   ', 'AND', 'python AND', 'NOT python', 'OR python', 'python (', 'python )', '()', '""',
+                      ',', ', ,', '(,)'):
+            with self.assertRaises(QuerySyntaxError, msg=query):
+                parse_query(query)
@@ -0,0 +1,65 @@
+from django.test import SimpleTestCase, override_settings
+
+from api.pagination import PageRequest, decode_cursor, encode_cursor, parse_page_params, rank_page, select_fields
+
+
+class RankPageTests(SimpleTestCase):
+    # (score, seq, item); ties on score are ranked in seq order
+    ENTRIES = [(50, 0, 'a'), (90, 1, 'b'), (70, 2, 'c'), (90, 3, 'd'), (70, 4, 'e'), (10, 5, 'f')]
+    RANKED = ['b', 'd', 'c', 'e', 'a', 'f']
+
+    def _pages(self, **page):
+        """Follow next_cursor from the first page to the last"""
+        pages = []
+        cursor = None
+        while True:
+            items, next_cursor = rank_page(
+                iter(self.ENTRIES), PageRequest(cursor=decode_cursor(cursor) if cursor else None, **page)
+            )
+            pages.append(items)
+            if next_cursor is None:
+                return pages
+            cursor = next_cursor
+
+    def test_unpaginated_is_a_stable_ranking(self):
+        self.assertEqual(rank_page(iter(self.ENTRIES), PageRequest()), (self.RANKED, None))
+
+    def test_pages_cover_every_entry_once(self):
+        for limit in (1, 2, 4, 6, 10):
+            pages = self._pages(limit=limit)
+            self.assertEqual([item for page in pages for item in page], self.RANKED)
+            self.assertTrue(all(pages), f"empty page with limit={limit}")
+
+    def test_top_k_bounds_every_page(self):
+        self.assertEqual(self._pages(top_k=5, limit=2), [['b', 'd'], ['c', 'e'], ['a']])
+        self.assertEqual(self._pages(top_k=3, limit=3), [['b', 'd', 'c']])
+        self.assertEqual(self._pages(top_k=2, limit=5), [['b', 'd']])
+        self.assertEqual(rank_page(iter(self.ENTRIES), PageRequest(top_k=3)), (['b', 'd', 'c'], None))
+
+    def test_cursor_at_top_k_returns_nothing(self):
+        cursor = decode_cursor(encode_cursor(70, 2, 3))
+        self.assertEqual(rank_page(iter(self.ENTRIES), PageRequest(top_k=3, limit=2, cursor=cursor)), ([], None))
+
+    def test_empty_entries(self):
+        self.assertEqual(rank_page(iter([]), PageRequest(limit=2)), ([], None))
+
+    def test_invalid_cursor(self):
+        for cursor in ('not-a-cursor', encode_cursor(1, 2, 3)[:-2], 'W10'):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+    @override_settings(ATS_MAX_PAGE_SIZE=10)
+    def test_parse_page_params(self):
+        page = parse_page_params({'limit': '50', 'top_k': '5', 'fields': 'score, text', 'exclude': 'text'})
+        self.assertEqual((page.limit, page.top_k, page.fields, page.exclude), (10, 5, ('score', 'text'), ('text',)))
+        self.assertTrue(page.paginated)
+        self.assertFalse(parse_page_params({}).paginated)
+        for params in ({'limit': '0'}, {'top_k': '-1'}, {'limit': 'ten'}, {'cursor': '%%%'}):
+            with self.assertRaises(ValueError):
+                parse_page_params(params)
+
+    def test_select_fields_keeps_the_resume_name(self):
+        result = {'resume': 'r.pdf', 'score': 80, 'text': 'long text'}
+        self.assertEqual(select_fields(result, PageRequest(fields=('score',))), {'resume': 'r.pdf', 'score': 80})
+        self.assertEqual(select_fields(result, PageRequest(exclude=('text',))), {'resume': 'r.pdf', 'score': 80})
+        self.assertIs(select_fields(result, PageRequest()), result)
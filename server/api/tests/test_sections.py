@@ -0,0 +1,85 @@
+import random
+import re
+
+from django.test import SimpleTestCase
+
+from api.sections import SECTION_HEADERS, ResumeSections
+
+
+def reference_experience(resume_content):
+    """The per-header str.find extractor ResumeSections replaced."""
+    experience_start = resume_content.lower().find("experience")
+    if experience_start == -1:
+        return ""
+    experience_end = len(resume_content)
+    for section in SECTION_HEADERS:
+        section_start = resume_content.lower().find(section.lower(), experience_start + 1)
+        if section_start != -1:
+            experience_end = min(experience_end, section_start)
+    return resume_content[experience_start:experience_end].strip()
+
+
+def reference_skills(resume_content):
+    skills_match = re.compile(r'Skills\s*[:\n]', re.IGNORECASE).search(resume_content)
+    if skills_match:
+        skills_start = skills_match.end()
+        skills_end = resume_content.find('\n\n', skills_start)
+        skills_section = resume_content[skills_start:skills_end].strip()
+        extracted_skills = []
+        for line in skills_section.split('\n'):
+            line_skills = re.split(r'[:,-]', line)
+            extracted_skills.extend([skill.strip() for skill in line_skills if skill.strip()])
+        return list(set(extracted_skills))
+    return []
+
+
+RESUME = """Jane Doe
+Summary: backend engineer
+
+Work Experience
+Acme Corp - 5 years building Python services
+Led the migration to AWS
+
+Technical Skills:
+Python, Django, SQL
+Docker - Kubernetes
+
+Education
+BSc Computer Science
+
+Certifications:
+AWS Certified Developer
+"""
+
+FRAGMENTS = SECTION_HEADERS + [
+    header.upper() for header in SECTION_HEADERS[:5]
+] + ['python', 'java, sql', '-', ':', ' ', '\n', '\n\n', 'experienced', 'skills\n', 'Skills:', 'İ', 'ß']
+
+
+class ResumeSectionsTests(SimpleTestCase):
+    def test_matches_reference_extractors(self):
+        sections = ResumeSections(RESUME)
+        self.assertEqual(sections.experience, reference_experience(RESUME))
+        self.assertEqual(sorted(sections.skills), sorted(reference_skills(RESUME)))
+
+    def test_matches_reference_extractors_on_random_resumes(self):
+        rng = random.Random(16)
+        for _ in range(2000):
+            text = ''.join(rng.choice(FRAGMENTS) + rng.choice(['', ' ', '\n']) for _ in range(rng.randint(0, 25)))
+            with self.subTest(text=text):
+                sections = ResumeSections(text)
+                self.assertEqual(sections.experience, reference_experience(text))
+                self.assertEqual(sorted(sections.skills), sorted(reference_skills(text)))
+
+    def test_no_sections(self):
+        sections = ResumeSections("Just a name")
+        self.assertEqual(sections.experience, "")
+        self.assertEqual(sections.skills, [])
+        self.assertEqual(sections.sections, {})
+
+    def test_headed_sections(self):
+        sections = ResumeSections(RESUME)
+        self.assertEqual(sections.education, "BSc Computer Science")
+        self.assertEqual(sections.certifications, "AWS Certified Developer")
+        self.assertEqual(sections.get("Licenses", "Summary"), "backend engineer")
+        self.assertTrue(sections.get("Work Experience").startswith("Acme Corp"))
@@ -0,0 +1,218 @@
+import re
+import threading
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from api import semantic_matcher
+from api.embedding_store import StoredResume
+from api.scoring import ResumeScorer
+from api.semantic_matcher import ATS, PreparedResume
+
+
+class WhitespaceTokenizer:
+    """One token per whitespace-separated word, with character offsets."""
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def __call__(self, texts, add_special_tokens=False, return_offsets_mapping=False):
+        return {'offset_mapping': [
+            [match.span() for match in re.finditer(r'\S+', text)] for text in texts
+        ]}
+
+
+class RecordingEncoder:
+    """Embeds each window as [number of tokens, index of its first token]."""
+
+    tokenizer = WhitespaceTokenizer()
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size):
+        self.calls.append(list(texts))
+        return np.array([[len(text.split()), int(text.split()[0][1:])] for text in texts], dtype=np.float32)
+
+
+def words(count):
+    return ' '.join(f'w{index}' for index in range(count))
+
+
+def make_ats(chunk_long_texts=True, chunk_pooling='mean', chunk_overlap=2, max_chunks=8):
+    ats = ATS.__new__(ATS)
+    ats.encoder = RecordingEncoder()
+    ats.max_seq_length = 8  # 6 tokens per window after special tokens
+    ats.embedding_dimension = 2
+    ats._truncate_embeddings = False
+    ats.chunk_long_texts = chunk_long_texts
+    ats.chunk_pooling = chunk_pooling
+    ats.chunk_overlap = chunk_overlap
+    ats.max_chunks = max_chunks
+    ats.truncation_stats = {'texts': 0, 'truncated_texts': 0, 'truncated_tokens': 0, 'windows': 0}
+    ats._stats_lock = threading.Lock()
+    return ats
+
+
+def normalize(vector):
+    vector = np.asarray(vector, dtype=np.float64)
+    return vector / np.linalg.norm(vector)
+
+
+class WindowPoolingTests(SimpleTestCase):
+    def test_splits_long_text_into_overlapping_windows(self):
+        ats = make_ats()
+        windows, counts, truncated = ats._split_windows([words(3), words(14)])
+
+        self.assertEqual(counts, [1, 3])
+        self.assertEqual(truncated, [0, 0])
+        self.assertEqual(windows, [
+            words(3),
+            'w0 w1 w2 w3 w4 w5',
+            'w4 w5 w6 w7 w8 w9',
+            'w8 w9 w10 w11 w12 w13',
+        ])
+
+    def test_max_chunks_truncates_the_tail(self):
+        ats = make_ats(max_chunks=2)
+        windows, counts, truncated = ats._split_windows([words(14)])
+
+        self.assertEqual(counts, [2])
+        self.assertEqual(truncated, [4])
+        self.assertEqual(windows[-1], 'w4 w5 w6 w7 w8 w9')
+
+    def test_overlap_is_capped_at_half_a_window(self):
+        ats = make_ats(chunk_overlap=100)
+        windows, _, _ = ats._split_windows([words(12)])
+
+        self.assertEqual([window.split()[0] for window in windows], ['w0', 'w3', 'w6'])
+
+    def test_encodes_all_windows_in_one_call_and_mean_pools(self):
+        ats = make_ats()
+        embeddings = ats.encode([words(3), words(14)])
+
+        self.assertEqual(len(ats.encoder.calls), 1)
+        self.assertEqual(len(ats.encoder.calls[0]), 4)
+        np.testing.assert_allclose(embeddings[0], normalize([3, 0]), rtol=1e-6)
+        np.testing.assert_allclose(embeddings[1], normalize([6, 4]), rtol=1e-6)
+
+    def test_max_pooling(self):
+        ats = make_ats(chunk_pooling='max')
+        embeddings = ats.encode([words(14)])
+
+        np.testing.assert_allclose(embeddings[0], normalize([6, 8]), rtol=1e-6)
+
+    def test_short_texts_are_encoded_unchanged(self):
+        ats = make_ats()
+        ats.encode([words(2), words(6)])
+
+        self.assertEqual(ats.encoder.calls, [[words(2), words(6)]])
+
+    def test_without_chunking_long_texts_are_counted_as_truncated(self):
+        ats = make_ats(chunk_long_texts=False)
+        ats.encode([words(14), words(3)])
+
+        self.assertEqual(ats.encoder.calls, [[words(14), words(3)]])
+        self.assertEqual(ats.truncation_stats, {
+            'texts': 2, 'truncated_texts': 1, 'truncated_tokens': 8, 'windows': 2,
+        })
+
+
+class LetterEncoder:
+    """Embeds a text by its counts of 'a', 'b' and 'c', L2-normalised."""
+
+    tokenizer = WhitespaceTokenizer()
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size):
+        self.calls.append(list(texts))
+        counts = np.array([[text.count(letter) + 0.1 for letter in 'abc'] for text in texts])
+        return counts / np.linalg.norm(counts, axis=1, keepdims=True)
+
+
+def prepare(resume_content, entities=None):
+    return PreparedResume(
+        experience=resume_content, skills=[], cleaned_experience=resume_content, cleaned_skills='',
+        entities=entities,
+    )
+
+
+class BatchSimilarityTests(SimpleTestCase):
+    JD = 'aab c'
+    RESUMES = ['aaa', 'bbb ccc', 'abc abc']
+
+    def setUp(self):
+        self.ats = make_ats(chunk_long_texts=False)
+        self.ats.max_seq_length = 512
+        self.ats.encoder = LetterEncoder()
+        self.ats.enable_ner = False
+        self.ats.model_name = 'letters'
+        self.ats.prepare_resume = prepare
+        self.ats.clean_jd = lambda jd_content=None: jd_content
+
+    def test_score_batch_matches_compute_similarity_batch(self):
+        results = self.ats.score_batch(self.RESUMES, self.JD)
+        cleaned = [prepare(resume).cleaned_text for resume in self.RESUMES]
+        scores = self.ats.compute_similarity_batch(cleaned, self.JD)
+
+        np.testing.assert_allclose([result.score for result in results], scores)
+        np.testing.assert_allclose(
+            np.vstack([result.embedding for result in results]), self.ats.encode(cleaned)
+        )
+
+    def test_known_embeddings_are_not_encoded_again(self):
+        embeddings = self.ats.encode(self.RESUMES)
+        jd_embedding = self.ats.encode([self.JD])[0]
+        self.ats.encoder.calls.clear()
+
+        scores = self.ats.compute_similarity_batch(
+            self.RESUMES, self.JD, jd_embedding=jd_embedding, resume_embeddings=embeddings
+        )
+
+        self.assertEqual(self.ats.encoder.calls, [])
+        np.testing.assert_allclose(scores, embeddings @ jd_embedding)
+
+    def test_scorer_scores_stored_and_new_resumes_alike(self):
+        scorer = ResumeScorer.__new__(ResumeScorer)
+        scorer.jd_text = self.JD
+        resumes = [(f'digest{index}', text) for index, text in enumerate(self.RESUMES)]
+        with mock.patch.object(ResumeScorer, '_store_resume_embedding') as store:
+            fresh = scorer._semantic_scores(resumes, {}, None, self.ats, None)
+        self.assertEqual(store.call_count, len(resumes))
+
+        stored = {
+            digest: StoredResume(
+                content_hash=digest, text=text, experience=prepared.experience, skills=[],
+                cleaned_experience=prepared.cleaned_experience, cleaned_skills=prepared.cleaned_skills,
+                embedding=embedding,
+            )
+            for (_, digest, text, prepared, embedding), _ in store.call_args_list
+        }
+        del stored['digest1']
+        self.ats.encoder.calls.clear()
+        with mock.patch.object(ResumeScorer, '_store_resume_embedding'):
+            mixed = scorer._semantic_scores(resumes + [('digest0', 'aaa')], stored, None, self.ats, None)
+
+        np.testing.assert_allclose(mixed, fresh + fresh[:1])
+        # Only the resume missing from the store is encoded, plus the JD for
+        # each path as no cached JD artifacts were given
+        self.assertEqual(sorted(self.ats.encoder.calls), [[self.JD], [self.JD], ['bbb ccc ']])
+
+
+@mock.patch('api.semantic_matcher.ensure_nltk_data', lambda: None)
+@mock.patch('api.semantic_matcher.stopwords', mock.Mock(words=lambda language: ['the']))
+@mock.patch('api.semantic_matcher._text_cleaner', None)
+class TextCleanerCacheTests(SimpleTestCase):
+    def test_degraded_cleaner_is_not_cached(self):
+        with mock.patch('api.semantic_matcher.get_lemmatizer', side_effect=LookupError('wordnet')):
+            first = semantic_matcher.get_text_cleaner()
+            self.assertFalse(first.complete)
+            self.assertIsNot(semantic_matcher.get_text_cleaner(), first)
+
+        with mock.patch('api.semantic_matcher.get_lemmatizer', return_value=mock.Mock()):
+            cleaner = semantic_matcher.get_text_cleaner()
+        self.assertTrue(cleaner.complete)
+        self.assertIs(semantic_matcher.get_text_cleaner(), cleaner)
@@ -0,0 +1,50 @@
+from django.test import SimpleTestCase
+
+from api.job_matcher import compute_certifications_score, compute_certifications_scores
+from api.term_matching import TermMatcher
+
+
+class TermMatcherTests(SimpleTestCase):
+    def test_case_folding_edge_cases(self):
+        # IGNORECASE matches these, but none lowercases to the term's key
+        matcher = TermMatcher(["iOS", "Postgres", "Kubernetes", "Linux"])
+        text = "İOS, ıos, Postgreſ, Kubernetes and LINUX"
+
+        self.assertEqual(
+            [term for term, _ in matcher.finditer(text)], ["iOS", "iOS", "Postgres", "Kubernetes", "Linux"]
+        )
+        self.assertEqual(matcher.counts(text)["iOS"], 2)
+
+    def test_longest_term_wins_at_a_shared_start(self):
+        matcher = TermMatcher(["AWS", "AWS Certified", "AWS Certified Developer"])
+        text = "AWS, aws certified, AWS Certified Developer, AWS Certifiedx"
+
+        self.assertEqual(
+            [(term, match.group()) for term, match in matcher.finditer(text)],
+            [("AWS", "AWS"), ("AWS Certified", "aws certified"),
+             ("AWS Certified Developer", "AWS Certified Developer"), ("AWS", "AWS")],
+        )
+
+    def test_prefix_of_another_term_inside_a_word(self):
+        matcher = TermMatcher(["Java", "JavaScript"])
+
+        self.assertEqual(matcher.counts("javascript, Java, Javas"), {"JavaScript": 1, "Java": 1})
+
+    def test_terms_differing_in_case_report_the_first(self):
+        matcher = TermMatcher(["SQL", "sql", "Sql Server"])
+
+        self.assertEqual(matcher.counts("sql SQL SQL SERVER"), {"SQL": 2, "Sql Server": 1})
+
+    def test_case_sensitive_and_substring_matching(self):
+        matcher = TermMatcher(["Go", "C#"], ignore_case=False, whole_words=False)
+
+        self.assertEqual(matcher.counts("Go go Google C# c#"), {"Go": 2, "C#": 1})
+
+    def test_no_terms(self):
+        self.assertEqual(list(TermMatcher([]).finditer("anything")), [])
+
+    def test_certifications_with_folded_characters(self):
+        texts = ["PMP and ſix ſigma", "AWS CERTIFIED"]
+
+        self.assertEqual(list(compute_certifications_scores(texts)),
+                         [compute_certifications_score(text) for text in texts])
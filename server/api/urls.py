@@ -1,6 +1,9 @@
 from django.urls import path
 from .views import CustomLoginView, ChangePasswordView, CurrentUserView
-from .ats_views import ResumeProcessingView, KeywordFilterView
+from .ats_views import (
+    ResumeProcessingView, ResumeStreamView, KeywordFilterView, ScoringJobView, ReadinessView,
+    BatchRerankView, BatchResultsView, MetricsView, ProfileListView, ProfileView,
+)
 from rest_framework_simplejwt.views import TokenRefreshView
 
 urlpatterns = [
@@ -9,5 +12,13 @@ urlpatterns = [
     path('profile/', CurrentUserView.as_view(), name='current-user'),
     path('refresh/', TokenRefreshView.as_view(), name='token-refresh'),
     path('process-resumes/', ResumeProcessingView.as_view(), name='process-resumes'),
+    path('process-resumes/stream/', ResumeStreamView.as_view(), name='process-resumes-stream'),
+    path('jobs/<uuid:job_id>/', ScoringJobView.as_view(), name='scoring-job'),
+    path('batches/<uuid:batch_id>/results/', BatchResultsView.as_view(), name='batch-results'),
+    path('batches/<uuid:batch_id>/rerank/', BatchRerankView.as_view(), name='batch-rerank'),
     path('filter-keywords/', KeywordFilterView.as_view(), name='filter-keywords'),
+    path('health/', ReadinessView.as_view(), name='health'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('profiles/', ProfileListView.as_view(), name='profiles'),
+    path('profiles/<str:profile_id>/', ProfileView.as_view(), name='profile'),
 ]
\ No newline at end of file
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
+import os
 from datetime import timedelta
 
 from pathlib import Path
@@ -55,6 +56,7 @@ MIDDLEWARE = [
 ]
 
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_EXPOSE_HEADERS = ['X-Profile-Id']
 
 ROOT_URLCONF = 'server.urls'
 
@@ -151,6 +153,134 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# ATS scoring pipeline
+
+# Load the encoder in a background thread when a server process starts
+# (set ATS_SERVING=1 for entry points other than server/wsgi.py,
+# server/asgi.py and runserver; management commands never do). /health/
+# reports 503 until it is ready; with this off, the first probe starts it
+ATS_WARMUP_ON_STARTUP = True
+
+# Number of resumes encoded per SentenceTransformer forward pass
+ATS_ENCODE_BATCH_SIZE = 32
+
+# Sentence encoder: model name, maximum tokens per text (None keeps the
+# model's default) and embedding dimension (None keeps the full vector;
+# smaller values truncate it, which suits Matryoshka-trained models)
+ATS_MODEL_NAME = 'all-mpnet-base-v2'
+ATS_MAX_SEQ_LENGTH = None
+ATS_EMBEDDING_DIMENSION = None
+
+# Texts over the model's token limit (long resumes, long JDs) are
+# truncated by default. With ATS_CHUNK_LONG_TEXTS they are split into
+# windows of max_seq_length tokens overlapping by ATS_CHUNK_OVERLAP, at
+# most ATS_MAX_CHUNKS per text, and the window embeddings are pooled with
+# ATS_CHUNK_POOLING ('mean' or 'max'). /health/ reports truncated tokens.
+ATS_CHUNK_LONG_TEXTS = False
+ATS_CHUNK_POOLING = 'mean'
+ATS_CHUNK_OVERLAP = 64
+ATS_MAX_CHUNKS = 8
+
+# Two-stage ranking: when ATS_SCREENING_MODEL_NAME is set (e.g.
+# 'all-MiniLM-L6-v2', 384-d) every resume is scored with that model first
+# and only the best ATS_RERANK_TOP_K are re-scored with ATS_MODEL_NAME.
+# Embeddings are cached and stored per model, so both can share the store.
+ATS_SCREENING_MODEL_NAME = None
+ATS_SCREENING_MAX_SEQ_LENGTH = None
+ATS_SCREENING_EMBEDDING_DIMENSION = None
+ATS_RERANK_TOP_K = 50
+
+# Sentence encoder inference backend on CPU: 'torch' (fp32), 'torch-int8'
+# (dynamically quantized Linear layers) or 'onnx' (ONNX Runtime; requires
+# the onnxruntime package, the graph is exported to ATS_ONNX_DIR once).
+# A non-fp32 backend is compared with fp32 on api/data/encoder_samples.txt
+# at load time and only used if every sample embedding keeps at least
+# ATS_ENCODER_MIN_SIMILARITY cosine similarity; otherwise fp32 is used.
+ATS_ENCODER_BACKEND = 'torch'
+ATS_ENCODER_VERIFY = True
+ATS_ENCODER_MIN_SIMILARITY = 0.99
+ATS_ONNX_DIR = BASE_DIR / 'model_cache' / 'onnx'
+
+# Optional spaCy NER stage: organizations, dates and skills are extracted
+# with one batched nlp.pipe call per batch; skills feed the semantic text
+# and date ranges fill in missing years of experience. Off by default so
+# workers that do not need it never load the pipeline.
+ATS_NER_ENABLED = False
+ATS_NER_MODEL = 'en_core_web_sm'
+
+# Worker processes used to extract text from uploaded PDF/DOCX files
+# (0 parses in the request thread), and the per-file time limit in seconds
+ATS_PARSE_WORKERS = min(4, os.cpu_count() or 1)
+ATS_PARSE_TIMEOUT = 30
+
+# Background scoring jobs (POST process-resumes/ with async=true): worker
+# threads per process, resumes scored per progress update, idle poll
+# interval, and seconds without a heartbeat before a running job is
+# considered abandoned and re-queued
+ATS_JOB_WORKERS = 2
+ATS_JOB_CHUNK_SIZE = 32
+ATS_JOB_POLL_INTERVAL = 5
+ATS_JOB_STALE_AFTER = 600
+
+# Admission control of synchronous scoring (process-resumes/ and its
+# stream): at most this many resumes are scored at once per server
+# process, overall and per user (0 disables). Further requests queue in
+# arrival order for up to ATS_ADMISSION_MAX_WAIT seconds, at most
+# ATS_ADMISSION_MAX_QUEUE of them; others get 429 with Retry-After.
+# Background jobs share the budget but wait without a limit.
+ATS_MAX_INFLIGHT_RESUMES = 64
+ATS_MAX_INFLIGHT_RESUMES_PER_USER = 32
+ATS_ADMISSION_MAX_WAIT = 10
+ATS_ADMISSION_MAX_QUEUE = 16
+
+# Torch threads per server process: intra-op (None = one per core) and
+# inter-op. With N processes per host, set ATS_TORCH_THREADS to about
+# cores / N so their encoders do not compete for the same cores.
+ATS_TORCH_THREADS = None
+ATS_TORCH_INTEROP_THREADS = None
+
+# Cross-request micro-batching: every encode call of the process runs on
+# one encoder thread, which merges the calls of concurrent requests into
+# one batch, waiting up to ATS_ENCODER_MICROBATCH_WAIT_MS for more calls
+# until ATS_ENCODER_MICROBATCH_SIZE texts are queued. A request waits at
+# most ATS_ENCODER_MICROBATCH_TIMEOUT seconds for its embeddings.
+ATS_ENCODER_MICROBATCH = True
+ATS_ENCODER_MICROBATCH_WAIT_MS = 5
+ATS_ENCODER_MICROBATCH_SIZE = 64
+ATS_ENCODER_MICROBATCH_TIMEOUT = 120
+
+# Scored batches (and their full-text keyword index) are kept this long
+# for filter-keywords/ with a batch_id
+ATS_BATCH_RETENTION_DAYS = 7
+
+# Largest page (limit) returned by the result endpoints
+ATS_MAX_PAGE_SIZE = 500
+
+# Request profiling (api.profiling): staff can profile a request with the
+# X-Profile: 1 header or ?profile=true; this fraction of all requests to
+# the scoring endpoints is profiled at random as well. The newest
+# ATS_PROFILE_MAX_FILES profiles are kept in ATS_PROFILE_DIR.
+ATS_PROFILE_SAMPLE_RATE = 0.0
+ATS_PROFILE_DIR = BASE_DIR / 'profiles'
+ATS_PROFILE_MAX_FILES = 100
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Job description artifacts (cleaned text, embedding, TF-IDF terms)
+    # keyed by SHA-256 of the extracted text; oldest entries are culled
+    # once MAX_ENTRIES is reached.
+    'jd_artifacts': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ats-jd-artifacts',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 256,
+        },
+    },
+}
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -12,5 +12,7 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
+# Lets the api app warm the model and start job workers in this process
+os.environ.setdefault('ATS_SERVING', '1')
 
 application = get_wsgi_application()